@@ -0,0 +1,32 @@
+"""empty message
+
+Revision ID: 8f2d4c6a1e37
+Revises: d3f6b1a8e594
+Create Date: 2026-10-20 09:37:14.218906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2d4c6a1e37'
+down_revision: Union[str, None] = 'd3f6b1a8e594'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lets the embedding cache be pruned by age without a full scan. Built concurrently so that embedding isn't blocked.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_cache_created_at ON embedding_cache (created_at)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_cache_created_at")
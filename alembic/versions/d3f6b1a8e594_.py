@@ -0,0 +1,41 @@
+"""empty message
+
+Revision ID: d3f6b1a8e594
+Revises: a5d83e6c0f27
+Create Date: 2026-10-19 10:21:48.603327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f6b1a8e594'
+down_revision: Union[str, None] = 'a5d83e6c0f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # HNSW indexes for nearest neighbor search of news entries. Built concurrently so that crawling isn't blocked.
+    # Iterative index scans used for filtered searches need pgvector 0.8 or newer.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_entries_summary_document_retrieval_embedding_hnsw "
+            "ON news_entries USING hnsw (summary_document_retrieval_embedding vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_entries_summary_document_retrieval_embedding_half_hnsw "
+            "ON news_entries USING hnsw (summary_document_retrieval_embedding_half halfvec_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_news_entries_summary_document_retrieval_embedding_half_hnsw")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_news_entries_summary_document_retrieval_embedding_hnsw")
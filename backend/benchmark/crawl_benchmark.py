@@ -0,0 +1,149 @@
+"""
+End-to-end crawler throughput benchmark against a replayed feed corpus and a local Postgres.
+Benchmark feeds are registered in the database at SQLALCHEMY_DATABASE_URL, so never point it at production.
+Runs the crawl pipeline several times. The first run fetches everything and later runs exercise conditional GET.
+Embedding is skipped so that no LLM quota is used.
+Every feed is served by the one local replay server, so the crawler's per host fetch limit is lifted to its
+global in-flight limit by default. Otherwise the benchmark would measure the per host cap, not the fetch engine.
+
+Usage: python backend/benchmark/crawl_benchmark.py <corpus dir> [--runs 2] [--latency-ms 50]
+       [--error-rate 0.01] [--not-modified-rate 0.5] [--crawl-window-days 3650] [--max-fetches-per-host 200]
+"""
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.replay_server import ReplayFeedServer, ReplayOptions, DEFAULT_REPLAY_PORT
+from cron import crawl_news
+from db.db import SqlSessionLocal, sql_engine
+from db.models import RssFeed, NewsEntry
+from datetime import timedelta
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert
+import argparse
+import asyncio
+import resource
+import time
+
+
+class DbRoundTripCounter:
+    """
+    Counts statements and commits sent to the database.
+    """
+
+    def __init__(self):
+        self.count = 0
+        event.listen(sql_engine, "before_cursor_execute", self.__on_round_trip)
+        event.listen(sql_engine, "commit", self.__on_round_trip)
+
+    def __on_round_trip(self, *args, **kwargs):
+        self.count += 1
+
+
+def prepare_benchmark_feeds(feed_urls: list[str]) -> list[int]:
+    """
+    Register the replayed feeds and wipe what earlier benchmark runs crawled from them.
+    """
+    with SqlSessionLocal() as sql_session:
+        sql_session.execute(
+            insert(RssFeed)
+            .values([{"feed_url": feed_url, "title": "benchmark"} for feed_url in feed_urls])
+            .on_conflict_do_nothing(index_elements=[RssFeed.feed_url])
+        )
+        feed_ids = [
+            feed_id
+            for (feed_id,) in sql_session.query(RssFeed.id).filter(RssFeed.feed_url.in_(feed_urls))
+        ]
+        sql_session.query(NewsEntry).filter(NewsEntry.rss_feed_id.in_(feed_ids)).delete(
+            synchronize_session=False
+        )
+        sql_session.query(RssFeed).filter(RssFeed.id.in_(feed_ids)).update(
+            {
+                RssFeed.last_crawl_time: None,
+                RssFeed.etag: None,
+                RssFeed.last_modified: None,
+                RssFeed.consecutive_failure_count: 0,
+                RssFeed.next_attempt_at: None,
+            },
+            synchronize_session=False,
+        )
+        sql_session.commit()
+    return feed_ids
+
+
+def count_news_entries(feed_ids: list[int]) -> int:
+    with SqlSessionLocal() as sql_session:
+        return (
+            sql_session.query(func.count(NewsEntry.id))
+            .filter(NewsEntry.rss_feed_id.in_(feed_ids))
+            .scalar()
+        )
+
+
+def run_benchmark(feed_ids: list[int], round_trip_counter: DbRoundTripCounter, run: int):
+    with SqlSessionLocal() as sql_session:
+        rss_feeds = sql_session.query(RssFeed).filter(RssFeed.id.in_(feed_ids)).all()
+    entry_count_before = count_news_entries(feed_ids)
+    round_trips_before = round_trip_counter.count
+    start_time = time.perf_counter()
+    failed_feed_ids = asyncio.run(crawl_news.crawl_rss_feeds(rss_feeds, embed_new_entries=False))
+    elapsed_seconds = time.perf_counter() - start_time
+    round_trips = round_trip_counter.count - round_trips_before
+    new_entry_count = count_news_entries(feed_ids) - entry_count_before
+    # ru_maxrss is in kilobytes on linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"run {run}: {len(rss_feeds)} feeds ({len(failed_feed_ids)} failed), {new_entry_count} new entries "
+        f"in {elapsed_seconds:.2f}s | {len(rss_feeds) / elapsed_seconds:.1f} feeds/s, "
+        f"{new_entry_count / elapsed_seconds:.1f} entries/s | peak RSS {peak_rss_mb:.0f} MB | "
+        f"{round_trips} DB round trips"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the crawler against a replayed feed corpus")
+    arg_parser.add_argument("corpus_dir")
+    arg_parser.add_argument("--runs", type=int, default=2)
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_REPLAY_PORT)
+    arg_parser.add_argument("--latency-ms", type=float, default=50)
+    arg_parser.add_argument("--error-rate", type=float, default=0)
+    arg_parser.add_argument("--not-modified-rate", type=float, default=0.5)
+    # Recorded feeds age, so widen the crawl window to keep their entries
+    arg_parser.add_argument("--crawl-window-days", type=int, default=3650)
+    arg_parser.add_argument(
+        "--max-fetches-per-host", type=int, default=crawl_news.MAX_IN_FLIGHT_FEED_FETCHES
+    )
+    args = arg_parser.parse_args()
+
+    crawl_news.CRAWL_WINDOW = timedelta(days=args.crawl_window_days)
+    print(
+        f"fetch limits: {crawl_news.MAX_IN_FLIGHT_FEED_FETCHES} in flight, {args.max_fetches_per_host} per host "
+        f"(crawler default {crawl_news.MAX_FEED_FETCHES_PER_HOST})"
+    )
+    crawl_news.MAX_FEED_FETCHES_PER_HOST = args.max_fetches_per_host
+    server = ReplayFeedServer(
+        args.corpus_dir,
+        ReplayOptions(args.latency_ms, args.error_rate, args.not_modified_rate),
+        args.port,
+    )
+    server.start()
+    try:
+        feed_ids = prepare_benchmark_feeds(server.get_feed_urls())
+        round_trip_counter = DbRoundTripCounter()
+        for run in range(1, args.runs + 1):
+            run_benchmark(feed_ids, round_trip_counter, run)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
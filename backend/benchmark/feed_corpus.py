@@ -0,0 +1,129 @@
+"""
+Record real feed responses into a local corpus so that crawler changes can be measured without the internet.
+
+Usage:
+    python backend/benchmark/feed_corpus.py <corpus dir> <file with one feed url per line>
+    python backend/benchmark/feed_corpus.py <corpus dir> --subscribed
+"""
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import HTTP_HEADER_USER_AGENT
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import httpx
+import json
+
+CORPUS_INDEX_FILE = "index.json"
+RECORD_TIMEOUT_SECONDS = 60
+RECORD_WORKER_NUM = 32
+# Headers describing the transfer rather than the document are not replayed
+NON_REPLAYED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+class RecordedResponse:
+    def __init__(self, feed_url: str, status_code: int, headers: list[(str, str)], body_file: str):
+        self.feed_url = feed_url
+        self.status_code = status_code
+        self.headers = headers
+        self.body_file = body_file
+
+    def to_json(self) -> dict:
+        return {
+            "feed_url": self.feed_url,
+            "status_code": self.status_code,
+            "headers": self.headers,
+            "body_file": self.body_file,
+        }
+
+    @staticmethod
+    def from_json(data: dict) -> "RecordedResponse":
+        return RecordedResponse(
+            data["feed_url"], data["status_code"], [tuple(header) for header in data["headers"]], data["body_file"]
+        )
+
+
+def load_corpus(corpus_dir: str) -> list[RecordedResponse]:
+    with open(os.path.join(corpus_dir, CORPUS_INDEX_FILE)) as f:
+        return [RecordedResponse.from_json(data) for data in json.load(f)]
+
+
+def _record_feed(client: httpx.Client, corpus_dir: str, feed_url: str) -> RecordedResponse | None:
+    try:
+        response = client.get(feed_url)
+    except Exception as e:
+        print(f"Error recording {feed_url}: {e}")
+        return None
+    # Bodies are stored by content hash so that feeds serving the same document share a file
+    body_file = hashlib.sha256(response.content).hexdigest()
+    with open(os.path.join(corpus_dir, body_file), "wb") as f:
+        f.write(response.content)
+    headers = [
+        (key, value)
+        for key, value in response.headers.multi_items()
+        if key.lower() not in NON_REPLAYED_HEADERS
+    ]
+    return RecordedResponse(feed_url, response.status_code, headers, body_file)
+
+
+def record_corpus(corpus_dir: str, feed_urls: list[str]) -> list[RecordedResponse]:
+    os.makedirs(corpus_dir, exist_ok=True)
+    with httpx.Client(
+        headers={"User-Agent": HTTP_HEADER_USER_AGENT},
+        timeout=RECORD_TIMEOUT_SECONDS,
+        follow_redirects=True,
+    ) as client:
+        with ThreadPoolExecutor(max_workers=RECORD_WORKER_NUM) as executor:
+            recorded_responses = [
+                recorded_response
+                for recorded_response in executor.map(
+                    lambda feed_url: _record_feed(client, corpus_dir, feed_url), feed_urls
+                )
+                if recorded_response is not None
+            ]
+    with open(os.path.join(corpus_dir, CORPUS_INDEX_FILE), "w") as f:
+        json.dump([recorded_response.to_json() for recorded_response in recorded_responses], f, indent=2)
+    return recorded_responses
+
+
+def _get_subscribed_feed_urls() -> list[str]:
+    from cron.crawl_news import get_subscribed_feed_ids
+    from db.db import SqlSessionLocal
+    from db.models import RssFeed
+
+    subscribed_feed_ids = get_subscribed_feed_ids()
+    with SqlSessionLocal() as sql_session:
+        return [
+            feed_url
+            for (feed_url,) in sql_session.query(RssFeed.feed_url).filter(
+                RssFeed.id.in_(subscribed_feed_ids)
+            )
+        ]
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    corpus_dir = sys.argv[1]
+    if sys.argv[2] == "--subscribed":
+        feed_urls = _get_subscribed_feed_urls()
+    else:
+        with open(sys.argv[2]) as f:
+            feed_urls = [line.strip() for line in f if line.strip()]
+    recorded_responses = record_corpus(corpus_dir, feed_urls)
+    print(f"Recorded {len(recorded_responses)} of {len(feed_urls)} feeds into {corpus_dir}")
+
+
+if __name__ == "__main__":
+    main()
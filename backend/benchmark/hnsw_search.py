@@ -0,0 +1,206 @@
+"""
+Recall@k and latency of HNSW search compared to exact search on a synthetic corpus of clustered embeddings,
+unfiltered and with a feed filter handled by iterative index scans or by over-fetching.
+The corpus goes into a scratch table of the database at SQLALCHEMY_DATABASE_URL, which is dropped afterwards.
+Needs pgvector 0.8 for iterative scans. Like the production search, ef_search is raised to at least the rows the
+index has to return, so values below k run as k.
+
+Usage: python backend/benchmark/hnsw_search.py [--rows 50000] [--queries 100] [--k 100]
+       [--filtered-feed-ratio 0.1] [--ef-search 40 100 200 400]
+"""
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.db import sql_engine
+from llm.news_entry_search import OVER_FETCH_FACTOR, MAX_HNSW_EF_SEARCH
+from sqlalchemy import text
+import argparse
+import numpy as np
+import time
+
+BENCHMARK_TABLE = "hnsw_benchmark_embeddings"
+DIMENSION = 768
+FEED_NUM = 100
+CLUSTER_NUM = 200
+INSERT_CHUNK_SIZE = 1000
+
+
+def to_vector_literal(embedding: np.ndarray) -> str:
+    return "[" + ",".join(f"{value:.6f}" for value in embedding) + "]"
+
+
+def make_corpus(row_num: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Normalized embeddings scattered around random topic centers, each with a random feed.
+    """
+    centers = rng.normal(size=(CLUSTER_NUM, DIMENSION))
+    embeddings = centers[rng.integers(0, CLUSTER_NUM, row_num)] + rng.normal(
+        scale=0.8, size=(row_num, DIMENSION)
+    )
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings.astype(np.float32), rng.integers(0, FEED_NUM, row_num)
+
+
+def load_corpus(embeddings: np.ndarray, feed_ids: np.ndarray):
+    with sql_engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE}"))
+        connection.execute(
+            text(
+                f"CREATE TABLE {BENCHMARK_TABLE} "
+                f"(id integer PRIMARY KEY, feed_id integer, embedding vector({DIMENSION}))"
+            )
+        )
+        for start in range(0, len(embeddings), INSERT_CHUNK_SIZE):
+            connection.execute(
+                text(f"INSERT INTO {BENCHMARK_TABLE} VALUES (:id, :feed_id, CAST(:embedding AS vector))"),
+                [
+                    {"id": i, "feed_id": int(feed_ids[i]), "embedding": to_vector_literal(embeddings[i])}
+                    for i in range(start, min(start + INSERT_CHUNK_SIZE, len(embeddings)))
+                ],
+            )
+    start_time = time.perf_counter()
+    with sql_engine.begin() as connection:
+        connection.execute(
+            text(
+                f"CREATE INDEX ON {BENCHMARK_TABLE} USING hnsw (embedding vector_cosine_ops) "
+                "WITH (m = 16, ef_construction = 64)"
+            )
+        )
+        connection.execute(text(f"ANALYZE {BENCHMARK_TABLE}"))
+    print(f"built HNSW index over {len(embeddings)} rows in {time.perf_counter() - start_time:.1f}s")
+
+
+def get_exact_ids(
+    embeddings: np.ndarray, feed_ids: np.ndarray, query: np.ndarray, k: int, allowed_feed_ids: list[int] | None
+) -> list[int]:
+    distances = 1 - embeddings @ query / np.linalg.norm(query)
+    if allowed_feed_ids is not None:
+        distances = np.where(np.isin(feed_ids, allowed_feed_ids), distances, np.inf)
+    nearest_ids = np.argsort(distances)[:k]
+    return [int(i) for i in nearest_ids if np.isfinite(distances[i])]
+
+
+def get_effective_ef_search(ef_search: int, k: int, strategy: str) -> int:
+    """
+    ef_search raised to the rows the index has to return, as search_nearest_news_entries_for_queries does.
+    Otherwise an index scan returns fewer than k rows and recall is capped below 1.
+    """
+    index_row_limit = k * OVER_FETCH_FACTOR if strategy == "over_fetch" else k
+    return min(max(ef_search, index_row_limit), MAX_HNSW_EF_SEARCH)
+
+
+def run_search(
+    queries: np.ndarray,
+    k: int,
+    allowed_feed_ids: list[int] | None,
+    strategy: str,
+    ef_search: int,
+) -> tuple[list[list[int]], list[float]]:
+    """
+    strategy is exact, iterative_scan or over_fetch.
+    """
+    if allowed_feed_ids is None:
+        sql = f"SELECT id FROM {BENCHMARK_TABLE} ORDER BY embedding <=> CAST(:query AS vector) LIMIT :k"
+    elif strategy == "over_fetch":
+        sql = (
+            f"SELECT id FROM (SELECT id, feed_id, embedding <=> CAST(:query AS vector) AS distance "
+            f"FROM {BENCHMARK_TABLE} ORDER BY distance LIMIT :over_fetch_k) nearest "
+            "WHERE feed_id = ANY(:feed_ids) ORDER BY distance LIMIT :k"
+        )
+    else:
+        sql = (
+            f"SELECT id FROM {BENCHMARK_TABLE} WHERE feed_id = ANY(:feed_ids) "
+            "ORDER BY embedding <=> CAST(:query AS vector) LIMIT :k"
+        )
+    result_ids = []
+    latencies = []
+    with sql_engine.connect() as connection:
+        for query in queries:
+            with connection.begin():
+                if strategy == "exact":
+                    connection.execute(text("SET LOCAL enable_indexscan = off"))
+                else:
+                    ef = get_effective_ef_search(ef_search, k, strategy)
+                    connection.execute(text(f"SET LOCAL hnsw.ef_search = {ef}"))
+                    iterative_scan = "strict_order" if strategy == "iterative_scan" and allowed_feed_ids else "off"
+                    connection.execute(text(f"SET LOCAL hnsw.iterative_scan = {iterative_scan}"))
+                start_time = time.perf_counter()
+                rows = connection.execute(
+                    text(sql),
+                    {
+                        "query": to_vector_literal(query),
+                        "k": k,
+                        "over_fetch_k": k * OVER_FETCH_FACTOR,
+                        "feed_ids": allowed_feed_ids,
+                    },
+                ).all()
+                latencies.append(time.perf_counter() - start_time)
+            result_ids.append([row[0] for row in rows])
+    return result_ids, latencies
+
+
+def report(name: str, result_ids: list[list[int]], expected_ids: list[list[int]], latencies: list[float], k: int):
+    recalls = [
+        len(set(ids) & set(expected)) / len(expected) for ids, expected in zip(result_ids, expected_ids) if expected
+    ]
+    print(
+        f"{name:32} recall@{k} {np.mean(recalls):.3f} | "
+        f"p50 {np.percentile(latencies, 50) * 1000:.1f} ms, p95 {np.percentile(latencies, 95) * 1000:.1f} ms"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare HNSW and exact search on a synthetic corpus")
+    arg_parser.add_argument("--rows", type=int, default=50000)
+    arg_parser.add_argument("--queries", type=int, default=100)
+    arg_parser.add_argument("--k", type=int, default=100)
+    arg_parser.add_argument("--filtered-feed-ratio", type=float, default=0.1)
+    arg_parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200, 400])
+    args = arg_parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings, feed_ids = make_corpus(args.rows, rng)
+    # Queries are near corpus rows, like a question about a crawled story
+    queries = embeddings[rng.integers(0, args.rows, args.queries)] + rng.normal(
+        scale=0.02, size=(args.queries, DIMENSION)
+    )
+    allowed_feed_ids = [
+        int(feed_id)
+        for feed_id in rng.choice(FEED_NUM, max(int(FEED_NUM * args.filtered_feed_ratio), 1), replace=False)
+    ]
+    load_corpus(embeddings, feed_ids)
+    try:
+        for filter_feed_ids, label in ((None, "unfiltered"), (allowed_feed_ids, "filtered")):
+            expected_ids = [
+                get_exact_ids(embeddings, feed_ids, query, args.k, filter_feed_ids) for query in queries
+            ]
+            result_ids, latencies = run_search(queries, args.k, filter_feed_ids, "exact", 0)
+            report(f"{label} exact", result_ids, expected_ids, latencies, args.k)
+            strategies = ["iterative_scan"] if filter_feed_ids is None else ["iterative_scan", "over_fetch"]
+            for strategy in strategies:
+                # Values raised to the same effective ef_search would repeat one run
+                for ef_search in sorted(
+                    {get_effective_ef_search(ef_search, args.k, strategy) for ef_search in args.ef_search}
+                ):
+                    result_ids, latencies = run_search(queries, args.k, filter_feed_ids, strategy, ef_search)
+                    name = f"{label} hnsw ef_search={ef_search}"
+                    if filter_feed_ids is not None:
+                        name += f" {strategy}"
+                    report(name, result_ids, expected_ids, latencies, args.k)
+    finally:
+        with sql_engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
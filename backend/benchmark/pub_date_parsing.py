@@ -0,0 +1,100 @@
+"""
+Microbenchmark of publish date parsing over recorded feed documents.
+Compares dateutil on every date with PubDateParser, which is what the crawler uses.
+
+Usage: python backend/benchmark/pub_date_parsing.py <directory of recorded feed documents>
+"""
+import sys
+import os
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dateutil import parser
+from utils.pub_date import PubDateParser
+import xml.etree.ElementTree as ET
+import time
+
+PUB_DATE_TAGS = {"pubDate", "published"}
+REPEAT_NUM = 5
+
+
+def load_pub_date_texts(corpus_dir: str) -> list[list[str]]:
+    """
+    Publish date texts of each recorded feed document in the directory.
+    """
+    pub_date_texts_per_feed = []
+    for file_name in sorted(os.listdir(corpus_dir)):
+        path = os.path.join(corpus_dir, file_name)
+        if not os.path.isfile(path):
+            continue
+        pub_date_texts = []
+        try:
+            for _, element in ET.iterparse(path):
+                # strip the namespace of atom tags
+                if element.tag.rsplit("}", 1)[-1] in PUB_DATE_TAGS and element.text:
+                    pub_date_texts.append(element.text)
+        except ET.ParseError:
+            continue
+        if pub_date_texts:
+            pub_date_texts_per_feed.append(pub_date_texts)
+    return pub_date_texts_per_feed
+
+
+def parse_with_dateutil(pub_date_texts_per_feed: list[list[str]]) -> list:
+    results = []
+    for pub_date_texts in pub_date_texts_per_feed:
+        for text in pub_date_texts:
+            try:
+                results.append(parser.parse(text))
+            except ValueError:
+                results.append(None)
+    return results
+
+
+def parse_with_pub_date_parser(pub_date_texts_per_feed: list[list[str]]) -> list:
+    results = []
+    for pub_date_texts in pub_date_texts_per_feed:
+        pub_date_parser = PubDateParser()
+        for text in pub_date_texts:
+            try:
+                results.append(pub_date_parser.parse(text))
+            except ValueError:
+                results.append(None)
+    return results
+
+
+def benchmark(parse_function, pub_date_texts_per_feed: list[list[str]]) -> (float, list):
+    best_seconds = float("inf")
+    for _ in range(REPEAT_NUM):
+        start_time = time.perf_counter()
+        results = parse_function(pub_date_texts_per_feed)
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+    return best_seconds, results
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(f"Usage: python {sys.argv[0]} <directory of recorded feed documents>")
+        sys.exit(1)
+    pub_date_texts_per_feed = load_pub_date_texts(sys.argv[1])
+    date_count = sum(len(pub_date_texts) for pub_date_texts in pub_date_texts_per_feed)
+    if date_count == 0:
+        print("No publish dates found.")
+        return
+    dateutil_seconds, dateutil_results = benchmark(parse_with_dateutil, pub_date_texts_per_feed)
+    fast_path_seconds, fast_path_results = benchmark(
+        parse_with_pub_date_parser, pub_date_texts_per_feed
+    )
+    mismatch_count = sum(
+        1 for expected, actual in zip(dateutil_results, fast_path_results) if expected != actual
+    )
+    print(f"{date_count} publish dates from {len(pub_date_texts_per_feed)} feeds")
+    print(f"dateutil:        {dateutil_seconds / date_count * 1e6:.2f} us/date")
+    print(f"PubDateParser:   {fast_path_seconds / date_count * 1e6:.2f} us/date")
+    print(f"speedup:         {dateutil_seconds / fast_path_seconds:.1f}x")
+    print(f"mismatched dates: {mismatch_count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Recall and latency of retrieval on the full precision embedding and its compact shadows, through their HNSW
+indexes and rerank, compared to exact full precision search.
+Queries are embeddings of random news entries with noise added, so no LLM quota is used.
+Run cron/quantized_embedding_backfill.py first so that every entry has its shadows.
+
+Usage: python backend/benchmark/quantized_search.py [--queries 100] [--k 100] [--noise 0.02]
+"""
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.db import SqlSessionLocal
+from db.models import NewsEntry
+from llm.news_entry_search import CoarseSearchMode, search_nearest_news_entries
+from sqlalchemy import func, select
+import argparse
+import numpy as np
+import time
+
+
+def load_query_embeddings(query_num: int, noise: float) -> list[list[float]]:
+    with SqlSessionLocal() as sql_session:
+        embeddings = [
+            embedding
+            for (embedding,) in sql_session.query(NewsEntry.summary_document_retrieval_embedding)
+            .filter(NewsEntry.summary_document_retrieval_embedding.is_not(None))
+            .order_by(func.random())
+            .limit(query_num)
+        ]
+    rng = np.random.default_rng(0)
+    return [
+        (np.asarray(embedding) + rng.normal(0, noise, len(embedding))).tolist()
+        for embedding in embeddings
+    ]
+
+
+def print_column_sizes():
+    with SqlSessionLocal() as sql_session:
+        sizes = sql_session.query(
+            func.avg(func.pg_column_size(NewsEntry.summary_document_retrieval_embedding)),
+            func.avg(func.pg_column_size(NewsEntry.summary_document_retrieval_embedding_half)),
+            func.avg(func.pg_column_size(NewsEntry.summary_document_retrieval_embedding_binary)),
+        ).one()
+    print(
+        "average bytes per row: "
+        + ", ".join(
+            f"{mode.value} {size or 0:.0f}"
+            for mode, size in zip(
+                (CoarseSearchMode.FULL, CoarseSearchMode.HALFVEC, CoarseSearchMode.BINARY), sizes
+            )
+        )
+    )
+
+
+def run_queries(
+    query_embeddings: list[list[float]], k: int, mode: CoarseSearchMode, exact: bool = False
+) -> tuple[list[list[int]], list[float]]:
+    result_ids = []
+    latencies = []
+    with SqlSessionLocal() as sql_session:
+        if exact:
+            # Without index scans the HNSW indexes aren't used and the search is a sequential scan
+            sql_session.execute(select(func.set_config("enable_indexscan", "off", True)))
+        for query_embedding in query_embeddings:
+            start_time = time.perf_counter()
+            news_entries = search_nearest_news_entries(sql_session, query_embedding, [], k, mode)
+            latencies.append(time.perf_counter() - start_time)
+            result_ids.append([news_entry.id for news_entry in news_entries])
+    return result_ids, latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare retrieval on quantized embeddings with exact search")
+    arg_parser.add_argument("--queries", type=int, default=100)
+    arg_parser.add_argument("--k", type=int, default=100)
+    arg_parser.add_argument("--noise", type=float, default=0.02)
+    args = arg_parser.parse_args()
+
+    query_embeddings = load_query_embeddings(args.queries, args.noise)
+    if not query_embeddings:
+        print("No embedded news entries found.")
+        return
+    print_column_sizes()
+    exact_ids, exact_latencies = run_queries(query_embeddings, args.k, CoarseSearchMode.FULL, exact=True)
+    print(
+        f"exact    p50 {np.percentile(exact_latencies, 50) * 1000:.1f} ms, "
+        f"p95 {np.percentile(exact_latencies, 95) * 1000:.1f} ms"
+    )
+    for mode in CoarseSearchMode:
+        result_ids, latencies = run_queries(query_embeddings, args.k, mode)
+        recalls = [
+            len(set(ids) & set(expected_ids)) / len(expected_ids)
+            for ids, expected_ids in zip(result_ids, exact_ids)
+            if expected_ids
+        ]
+        print(
+            f"{mode.value:8} recall@{args.k} {np.mean(recalls):.3f} | "
+            f"p50 {np.percentile(latencies, 50) * 1000:.1f} ms, p95 {np.percentile(latencies, 95) * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
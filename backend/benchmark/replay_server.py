@@ -0,0 +1,122 @@
+"""
+Local HTTP server replaying a recorded feed corpus at /feeds/<index> with configurable latency, errors and 304s.
+
+Usage: python backend/benchmark/replay_server.py <corpus dir> [--port 8799] [--latency-ms 50]
+       [--error-rate 0.01] [--not-modified-rate 0.5]
+"""
+import sys
+import os
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.feed_corpus import RecordedResponse, load_corpus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import random
+import threading
+import time
+
+DEFAULT_REPLAY_PORT = 8799
+
+
+class ReplayOptions:
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0, not_modified_rate: float = 0):
+        # Each response is delayed by latency_ms +-50%
+        self.latency_ms = latency_ms
+        # Share of requests answered with 503
+        self.error_rate = error_rate
+        # Share of conditional requests answered with 304
+        self.not_modified_rate = not_modified_rate
+
+
+class ReplayFeedServer:
+    """
+    Serves recorded responses from a background thread so that a benchmark can crawl it in the same process.
+    """
+
+    def __init__(self, corpus_dir: str, options: ReplayOptions, port: int = DEFAULT_REPLAY_PORT):
+        self.recorded_responses = load_corpus(corpus_dir)
+        bodies = {}
+        for recorded_response in self.recorded_responses:
+            if recorded_response.body_file not in bodies:
+                with open(os.path.join(corpus_dir, recorded_response.body_file), "rb") as f:
+                    bodies[recorded_response.body_file] = f.read()
+        self.__server = ThreadingHTTPServer(
+            ("127.0.0.1", port), _get_handler_class(self.recorded_responses, bodies, options)
+        )
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+    @property
+    def port(self) -> int:
+        return self.__server.server_address[1]
+
+    def get_feed_urls(self) -> list[str]:
+        return [f"http://127.0.0.1:{self.port}/feeds/{i}" for i in range(len(self.recorded_responses))]
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def serve_forever(self):
+        self.__server.serve_forever()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+def _get_handler_class(
+    recorded_responses: list[RecordedResponse], bodies: dict[str, bytes], options: ReplayOptions
+):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if options.latency_ms > 0:
+                time.sleep(options.latency_ms * random.uniform(0.5, 1.5) / 1000)
+            index = self.path.removeprefix("/feeds/")
+            if not index.isdigit() or int(index) >= len(recorded_responses):
+                self.send_error(404, "Not Found")
+                return
+            if random.random() < options.error_rate:
+                self.send_error(503, "Service Unavailable")
+                return
+            recorded_response = recorded_responses[int(index)]
+            is_conditional = self.headers.get("If-None-Match") or self.headers.get("If-Modified-Since")
+            if is_conditional and random.random() < options.not_modified_rate:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = bodies[recorded_response.body_file]
+            self.send_response(recorded_response.status_code)
+            for key, value in recorded_response.headers:
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Replay a recorded feed corpus")
+    arg_parser.add_argument("corpus_dir")
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_REPLAY_PORT)
+    arg_parser.add_argument("--latency-ms", type=float, default=0)
+    arg_parser.add_argument("--error-rate", type=float, default=0)
+    arg_parser.add_argument("--not-modified-rate", type=float, default=0)
+    args = arg_parser.parse_args()
+    server = ReplayFeedServer(
+        args.corpus_dir,
+        ReplayOptions(args.latency_ms, args.error_rate, args.not_modified_rate),
+        args.port,
+    )
+    print(f"Replaying {len(server.recorded_responses)} feeds on port {server.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,34 +6,395 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from db.models import NewsEntry
+from sqlalchemy import Integer, case, cast, column, event, func, or_, update, values
+from pgvector.sqlalchemy import Vector, HALFVEC
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timedelta
+from utils.dedupe import NearDuplicateIndex, canonicalize_url, get_content_hash, get_minhash
+from utils.logger import logger
+from utils.text import estimate_token_count, truncate_to_token_budget
 from llm.client_proxy_factory import get_default_client_proxy
 from llm.client_proxy import EmbeddingTaskType
 
+# Max texts per embed request
 EMBEDDING_RATE_LIMIT = 100
+# Input limit of gemini-embedding-001. Text beyond it is silently dropped by the API.
+EMBEDDING_INPUT_TOKEN_BUDGET = 2048
+# Total input tokens allowed in one embed request
+MAX_EMBEDDING_BATCH_TOKENS = int(os.getenv("MAX_EMBEDDING_BATCH_TOKENS", "20000"))
+# Characters compared to tell whether the content starts with the description
+DESCRIPTION_PREFIX_LENGTH = 100
+# Rows per INSERT statement. Keeps bind parameters well below postgres' 65535 limit.
+NEWS_ENTRY_INSERT_CHUNK_SIZE = 1000
+# Columns derived from the feed document which a reparse may overwrite
+PARSED_NEWS_ENTRY_COLUMNS = [
+    "entry_url",
+    "title",
+    "description",
+    "content",
+    "raw_description",
+    "raw_content",
+    "pub_time",
+    "canonical_url",
+    "content_hash",
+    "minhash",
+]
+# Columns computed from parsed columns, cleared by a reparse which changes their source so that they are recomputed
+EMBEDDING_NEWS_ENTRY_COLUMNS = [
+    "summary_clustering_embedding",
+    "summary_document_retrieval_embedding",
+    "summary_document_retrieval_embedding_half",
+    "summary_document_retrieval_embedding_binary",
+]
+# Copies of a story are expected to be published within this window of each other
+DUPLICATE_NEWS_ENTRY_WINDOW = timedelta(days=7)
 
 def _empty_for_none(value):
     if value is None:
         return ""
     return value
 
-def generate_embedding(news_entry_list: list[NewsEntry]):
+class EmbeddingInputStats:
+    """
+    How much news entry text is cut to fit the embedding model's input.
+    """
 
-    chunked_news_entry_list = [
-        news_entry_list[i : i + EMBEDDING_RATE_LIMIT]
-        for i in range(0, len(news_entry_list), EMBEDDING_RATE_LIMIT)
+    def __init__(self):
+        self.entry_count = 0
+        self.truncated_entry_count = 0
+        self.token_count = 0
+        self.dropped_token_count = 0
+
+    def record(self, token_count: int, kept_token_count: int):
+        self.entry_count += 1
+        self.token_count += token_count
+        if kept_token_count < token_count:
+            self.truncated_entry_count += 1
+            self.dropped_token_count += token_count - kept_token_count
+
+    def describe(self) -> str:
+        return (
+            f"embedding input {self.truncated_entry_count}/{self.entry_count} entries truncated, "
+            f"~{self.dropped_token_count}/{self.token_count} tokens dropped"
+        )
+
+
+embedding_input_stats = EmbeddingInputStats()
+
+
+def get_embedding_input(news_entry: NewsEntry) -> str:
+    """
+    Title, description and content of the entry cut to the model's input budget, so the title and lead
+    paragraphs are always embedded and nothing is uploaded only to be dropped by the API.
+    The description is left out if the content starts with it, as feeds often use the lead as description.
+    """
+    title = _empty_for_none(news_entry.title)
+    description = _empty_for_none(news_entry.description)
+    content = _empty_for_none(news_entry.content)
+    if description and content.startswith(description[:DESCRIPTION_PREFIX_LENGTH]):
+        description = ""
+    embedding_input = "\n".join(part for part in (title, description, content) if part)
+    embedding_input_budgeted = truncate_to_token_budget(embedding_input, EMBEDDING_INPUT_TOKEN_BUDGET)
+    embedding_input_stats.record(
+        estimate_token_count(embedding_input), estimate_token_count(embedding_input_budgeted)
+    )
+    return embedding_input_budgeted
+
+
+def pack_embedding_batches(items: list, embedding_inputs: list[str]) -> list[tuple[list, list[str]]]:
+    """
+    Split items and their embedding inputs into as few embed requests as the per request limits allow.
+    """
+    batches = []
+    batch_items, batch_inputs, batch_token_count = [], [], 0
+    for item, embedding_input in zip(items, embedding_inputs):
+        token_count = estimate_token_count(embedding_input)
+        if batch_items and (
+            len(batch_items) >= EMBEDDING_RATE_LIMIT
+            or batch_token_count + token_count > MAX_EMBEDDING_BATCH_TOKENS
+        ):
+            batches.append((batch_items, batch_inputs))
+            batch_items, batch_inputs, batch_token_count = [], [], 0
+        batch_items.append(item)
+        batch_inputs.append(embedding_input)
+        batch_token_count += token_count
+    if batch_items:
+        batches.append((batch_items, batch_inputs))
+    return batches
+
+
+def embed_texts(embedding_input_list: list[str]) -> tuple[list[list[float]], list[list[float]]]:
+    """
+    Clustering and document retrieval embeddings of the texts. Safe to call from several threads.
+    """
+    clustering_embedding = get_default_client_proxy().embed_content(
+        embedding_input_list, task_type=EmbeddingTaskType.CLUSTERING
+    )
+    document_retrieval_embedding = get_default_client_proxy().embed_content(
+        embedding_input_list, task_type=EmbeddingTaskType.RETRIEVAL_DOCUMENT
+    )
+    return clustering_embedding, document_retrieval_embedding
+
+
+def save_news_entry_embeddings(
+    sql_session: Session,
+    news_entry_ids: list[int],
+    clustering_embedding: list[list[float]],
+    document_retrieval_embedding: list[list[float]],
+):
+    """
+    Write embeddings of many news entries with a single UPDATE ... FROM (VALUES ...) statement
+    instead of flushing dirty ORM objects one row at a time.
+    """
+    embedding_values = values(
+        column("id", Integer),
+        column("clustering_embedding", Vector(768)),
+        column("document_retrieval_embedding", Vector(768)),
+        name="embedding_values",
+    ).data(list(zip(news_entry_ids, clustering_embedding, document_retrieval_embedding)))
+    sql_session.execute(
+        update(NewsEntry)
+        .where(NewsEntry.id == embedding_values.c.id)
+        .values(
+            summary_clustering_embedding=cast(embedding_values.c.clustering_embedding, Vector(768)),
+            summary_document_retrieval_embedding=cast(
+                embedding_values.c.document_retrieval_embedding, Vector(768)
+            ),
+            summary_document_retrieval_embedding_half=cast(
+                embedding_values.c.document_retrieval_embedding, HALFVEC(768)
+            ),
+            summary_document_retrieval_embedding_binary=func.binary_quantize(
+                cast(embedding_values.c.document_retrieval_embedding, Vector(768))
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_news_entry_fingerprints(news_entry_row: dict) -> dict:
+    """
+    Fingerprints of a news entry row used to detect copies of its story from other feeds.
+    """
+    return {
+        "canonical_url": canonicalize_url(news_entry_row["entry_url"]),
+        "content_hash": get_content_hash(
+            news_entry_row["title"], news_entry_row["description"], news_entry_row["content"]
+        ),
+        "minhash": get_minhash(news_entry_row["title"], news_entry_row["description"]),
+    }
+
+
+def load_near_duplicate_index(sql_session: Session) -> NearDuplicateIndex:
+    """
+    Index canonical news entries crawled recently so that new copies of their stories can be linked to them.
+    """
+    near_duplicate_index = NearDuplicateIndex()
+    canonical_entries = (
+        sql_session.query(
+            NewsEntry.id, NewsEntry.canonical_url, NewsEntry.content_hash, NewsEntry.minhash
+        )
+        .filter(
+            NewsEntry.duplicate_of_id.is_(None),
+            NewsEntry.crawl_time >= datetime.now() - DUPLICATE_NEWS_ENTRY_WINDOW,
+        )
+        .all()
+    )
+    for entry_id, canonical_url, content_hash, minhash in canonical_entries:
+        near_duplicate_index.add(entry_id, canonical_url, content_hash, minhash)
+    logger.info(f"Loaded {len(canonical_entries)} canonical news entries into near duplicate index.")
+    return near_duplicate_index
+
+
+def _add_exact_duplicate_candidates(
+    sql_session: Session, news_entry_rows: list[dict], near_duplicate_index: NearDuplicateIndex
+):
+    """
+    Look up canonical entries sharing a canonical url or content hash with the rows.
+    Catches copies persisted by other crawl workers after the index was loaded.
+    """
+    canonical_urls = {row["canonical_url"] for row in news_entry_rows if row["canonical_url"]}
+    content_hashes = {row["content_hash"] for row in news_entry_rows if row["content_hash"]}
+    if not canonical_urls and not content_hashes:
+        return
+    candidates = (
+        sql_session.query(
+            NewsEntry.id, NewsEntry.canonical_url, NewsEntry.content_hash, NewsEntry.minhash
+        )
+        .filter(
+            NewsEntry.duplicate_of_id.is_(None),
+            NewsEntry.crawl_time >= datetime.now() - DUPLICATE_NEWS_ENTRY_WINDOW,
+            or_(
+                NewsEntry.canonical_url.in_(canonical_urls),
+                NewsEntry.content_hash.in_(content_hashes),
+            ),
+        )
+        .all()
+    )
+    for entry_id, canonical_url, content_hash, minhash in candidates:
+        near_duplicate_index.add(entry_id, canonical_url, content_hash, minhash)
+
+
+def __get_reparsed_column_values(excluded) -> dict:
+    """
+    Overwrite the parsed columns of an existing entry. Embeddings of an entry whose embedded text changed and the
+    article text of an entry whose url changed are cleared for the backfill and the agent to recompute.
+    """
+    table = NewsEntry.__table__
+    embedded_text_changed = or_(
+        *(
+            table.c[column_name].is_distinct_from(excluded[column_name])
+            for column_name in ("title", "description", "content")
+        )
+    )
+    column_values = {column_name: excluded[column_name] for column_name in PARSED_NEWS_ENTRY_COLUMNS}
+    for column_name in EMBEDDING_NEWS_ENTRY_COLUMNS:
+        column_values[column_name] = case((embedded_text_changed, None), else_=table.c[column_name])
+    column_values["article_text"] = case(
+        (table.c.entry_url.is_distinct_from(excluded.entry_url), None), else_=table.c.article_text
+    )
+    return column_values
+
+
+def _insert_news_entry_rows(
+    sql_session: Session, rows: list[dict], update_existing: bool
+) -> list[(int, str)]:
+    inserted = []
+    for i in range(0, len(rows), NEWS_ENTRY_INSERT_CHUNK_SIZE):
+        statement = insert(NewsEntry.__table__).values(rows[i : i + NEWS_ENTRY_INSERT_CHUNK_SIZE])
+        if update_existing:
+            statement = statement.on_conflict_do_update(
+                index_elements=[NewsEntry.entry_rss_guid],
+                set_=__get_reparsed_column_values(statement.excluded),
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[NewsEntry.entry_rss_guid])
+        inserted.extend(
+            sql_session.execute(
+                statement.returning(NewsEntry.id, NewsEntry.entry_rss_guid)
+            ).all()
+        )
+    return inserted
+
+
+def _get_existing_entry_ids_by_guid(sql_session: Session, rows: list[dict]) -> dict[str, int]:
+    guids = {row["entry_rss_guid"] for row in rows if row["entry_rss_guid"] is not None}
+    if not guids:
+        return {}
+    return {
+        guid: entry_id
+        for entry_id, guid in sql_session.query(NewsEntry.id, NewsEntry.entry_rss_guid)
+        .filter(NewsEntry.entry_rss_guid.in_(guids))
+        .all()
+    }
+
+
+def _resolve_canonical_ids(sql_session: Session, entry_ids: set[int]) -> dict[int, int]:
+    """
+    Map entries among entry_ids which are duplicates themselves to their canonical entry, so that links stay
+    one level deep as readers' coalesce(duplicate_of_id, id) assumes.
+    """
+    if not entry_ids:
+        return {}
+    return dict(
+        sql_session.query(NewsEntry.id, NewsEntry.duplicate_of_id)
+        .filter(NewsEntry.id.in_(entry_ids), NewsEntry.duplicate_of_id.is_not(None))
+        .all()
+    )
+
+
+def bulk_insert_news_entries(
+    sql_session: Session,
+    news_entry_rows: list[dict],
+    near_duplicate_index: NearDuplicateIndex | None = None,
+    update_existing: bool = False,
+) -> list[int]:
+    """
+    Insert news entry rows with multi-row Core INSERT statements. Entries whose GUID already exists are skipped
+    by the unique index on entry_rss_guid, so concurrent crawls of feeds sharing a GUID can't race.
+    Rows must carry the fingerprints from get_news_entry_fingerprints. A new row whose story matches a recent
+    canonical entry or an earlier row is linked to it through duplicate_of_id. New canonical entries are added to
+    the index once the session commits, so a rolled back batch leaves no ids behind in it.
+    With update_existing, rows whose GUID exists overwrite the parsed columns of the existing entry instead.
+    Returns ids of inserted or updated rows. Caller commits the session.
+    """
+    if not news_entry_rows:
+        return []
+    if near_duplicate_index is None:
+        near_duplicate_index = NearDuplicateIndex()
+    # Dedupe in memory first so that the same GUID isn't sent twice in one batch
+    unique_rows = {}
+    for row in news_entry_rows:
+        guid = row["entry_rss_guid"]
+        unique_rows[guid if guid is not None else id(row)] = row
+    rows = list(unique_rows.values())
+    existing_entry_ids = _get_existing_entry_ids_by_guid(sql_session, rows)
+    # Entries seen before keep their duplicate_of_id, so only new ones are deduped. Otherwise a re-seen entry
+    # would match its own stored row.
+    new_rows = [row for row in rows if row["entry_rss_guid"] not in existing_entry_ids]
+    _add_exact_duplicate_candidates(sql_session, new_rows, near_duplicate_index)
+
+    # Canonical rows of this batch are keyed by GUID until they get an id
+    batch_index = NearDuplicateIndex()
+    canonical_rows = []
+    for row in rows:
+        if row["entry_rss_guid"] in existing_entry_ids:
+            row["duplicate_of_id"] = None
+            canonical_rows.append(row)
+    duplicate_rows = []
+    for row in new_rows:
+        row["duplicate_of_id"] = near_duplicate_index.find(
+            row["canonical_url"], row["content_hash"], row["minhash"]
+        )
+        if row["duplicate_of_id"] is not None:
+            duplicate_rows.append((row, None))
+            continue
+        canonical_guid = batch_index.find(row["canonical_url"], row["content_hash"], row["minhash"])
+        if canonical_guid is not None:
+            duplicate_rows.append((row, canonical_guid))
+            continue
+        canonical_rows.append(row)
+        if row["entry_rss_guid"] is not None:
+            batch_index.add(row["entry_rss_guid"], row["canonical_url"], row["content_hash"], row["minhash"])
+
+    inserted = _insert_news_entry_rows(sql_session, canonical_rows, update_existing)
+    entry_id_by_guid = {guid: entry_id for entry_id, guid in inserted}
+    new_canonical_entries = [
+        (entry_id_by_guid[row["entry_rss_guid"]], row["canonical_url"], row["content_hash"], row["minhash"])
+        for row in canonical_rows
+        if row["entry_rss_guid"] not in existing_entry_ids and row["entry_rss_guid"] in entry_id_by_guid
     ]
-        
-    for news_entry_list_chunk in chunked_news_entry_list:
-        embedding_input_list = [
-            f"{_empty_for_none(news_entry.title)} {_empty_for_none(news_entry.description)} {_empty_for_none(news_entry.content)}"
-            for news_entry in news_entry_list_chunk
-        ]
-        clustering_embedding = get_default_client_proxy().embed_content(
-            embedding_input_list, task_type=EmbeddingTaskType.CLUSTERING
-        )
-        document_retrieval_embedding = get_default_client_proxy().embed_content(
-            embedding_input_list, task_type=EmbeddingTaskType.RETRIEVAL_DOCUMENT
-        )
-        for j, news_entry in enumerate(news_entry_list_chunk):
-            news_entry.summary_clustering_embedding = clustering_embedding[j]
-            news_entry.summary_document_retrieval_embedding = document_retrieval_embedding[j]
+    # Canonical rows skipped because their GUID was inserted concurrently are resolved to the existing entries
+    missing_guids = {
+        canonical_guid
+        for _, canonical_guid in duplicate_rows
+        if canonical_guid is not None and canonical_guid not in entry_id_by_guid
+    }
+    if missing_guids:
+        entry_id_by_guid.update(
+            _get_existing_entry_ids_by_guid(
+                sql_session, [{"entry_rss_guid": guid} for guid in missing_guids]
+            )
+        )
+    for row, canonical_guid in duplicate_rows:
+        if canonical_guid is not None:
+            row["duplicate_of_id"] = entry_id_by_guid.get(canonical_guid)
+    canonical_id_by_duplicate_id = _resolve_canonical_ids(
+        sql_session,
+        {row["duplicate_of_id"] for row, _ in duplicate_rows if row["duplicate_of_id"] is not None},
+    )
+    for row, _ in duplicate_rows:
+        row["duplicate_of_id"] = canonical_id_by_duplicate_id.get(row["duplicate_of_id"], row["duplicate_of_id"])
+    inserted_duplicates = _insert_news_entry_rows(
+        sql_session, [row for row, _ in duplicate_rows], update_existing
+    )
+    inserted.extend(inserted_duplicates)
+    if inserted_duplicates:
+        logger.info(f"Linked {len(inserted_duplicates)} of {len(new_rows)} new news entries to existing stories.")
+
+    @event.listens_for(sql_session, "after_commit", once=True)
+    def add_new_canonical_entries(_):
+        for entry_id, canonical_url, content_hash, minhash in new_canonical_entries:
+            near_duplicate_index.add(entry_id, canonical_url, content_hash, minhash)
+
+    return [entry_id for entry_id, _ in inserted]
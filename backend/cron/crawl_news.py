@@ -11,21 +11,42 @@ load_dotenv(
 # Add the parent directory to sys.path so that we can import modules correctly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
 from db.db import get_sql_db, SqlSessionLocal
 from db.models import User, RssFeed, NewsEntry
 from datetime import datetime, timedelta, timezone
-import requests
-from sqlalchemy import func
+from sqlalchemy import func, update, values, column, case, cast, Integer, Boolean, DateTime, String
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
 import random
 import xml.etree.ElementTree as ET
+import io
 import traceback
-from constants import HTTP_HEADER_USER_AGENT, SQL_BATCH_SIZE
-from dateutil import parser
+from constants import HTTP_HEADER_USER_AGENT
 from enum import Enum
 import time
-from cron.news_entry_embedding_backfill import backfill_embedding
+from cron.news_entry_embedding_backfill import backfill_embedding, copy_canonical_embedding
+from cron.feed_lease import get_lease_owner, claim_feeds, release_feed_leases
+from cron.common import (
+    EMBEDDING_RATE_LIMIT,
+    bulk_insert_news_entries,
+    embed_texts,
+    embedding_input_stats,
+    get_embedding_input,
+    pack_embedding_batches,
+    save_news_entry_embeddings,
+    get_news_entry_fingerprints,
+    load_near_duplicate_index,
+)
+from llm.embedding_cache import embedding_cache_stats, prune_embedding_cache
 from utils.rss import get_atom_tag, is_valid_rss_type
+from utils.http import AsyncHttpFetcher
+from utils.dedupe import NearDuplicateIndex
+from utils.pub_date import PubDateParser
+from utils.feed_archive import archive_feed_body, prune_feed_archive
+from utils.article_extractor import extract_article_text
+from utils.text import html_to_text, estimate_token_count
 from utils.logger import setup_logger, logger
 
 
@@ -35,28 +56,53 @@ setup_logger("crawl_news")
 UNLIMITED_USER_EMAILS = os.getenv("UNLIMITED_USER_EMAILS", "").split(",")
 LIMITED_USER_SIZE = 20
 MAX_CRAWL_FEED_NUM = 2000
-
-
-class DocRoot:
-    def __init__(
-        self,
-        rss_root: ET.Element | None = None,
-        atom_feed_root: ET.Element | None = None,
-    ):
-        self.rss_root = rss_root
-        self.atom_feed_root = atom_feed_root
-
-
-def _find_doc_root(doc: ET) -> DocRoot:
-    if doc.tag == "rss":
-        return DocRoot(rss_root=doc)
-    else:
-        rss_root = doc.find(".//rss")
-        if rss_root is not None:
-            return DocRoot(rss_root=rss_root)
-    if doc.tag == get_atom_tag("feed"):
-        return DocRoot(atom_feed_root=doc)
-    raise RuntimeError("Failed to determine doc type")
+# Total number of feed fetches in flight across all hosts
+MAX_IN_FLIGHT_FEED_FETCHES = 200
+# Number of concurrent fetches against a single host
+MAX_FEED_FETCHES_PER_HOST = 4
+FEED_FETCH_TIMEOUT_SECONDS = 120
+# Abort downloading feed documents larger than this
+MAX_FEED_DOCUMENT_BYTES = 10 * 1024 * 1024
+# Only entries published within this window are crawled
+CRAWL_WINDOW = timedelta(days=7)
+# Entries published shortly before last crawl may show up in the feed late so they are still parsed
+LAST_CRAWL_GRACE_PERIOD = timedelta(days=1)
+# Stop parsing a feed after this many consecutive entries older than the crawl window or last crawl
+MAX_CONSECUTIVE_STALE_ITEMS = 5
+# Number of news entries buffered across feeds before they are inserted in one statement
+NEWS_ENTRY_INGEST_BATCH_SIZE = 1000
+# Number of feeds whose crawl status is buffered before it is written in one statement
+FEED_STATUS_FLUSH_SIZE = 200
+# Buffered crawl results are written at least this often
+CRAWL_RESULT_FLUSH_INTERVAL_SECONDS = 10
+MAX_FEED_ERROR_LENGTH = 1000
+# Crawled feeds waiting to be persisted. Crawling pauses when the persist stage falls this far behind.
+CRAWL_RESULT_QUEUE_SIZE = 500
+# Persisted news entries waiting to be embedded. Entries beyond it are left to backfill_embedding.
+EMBED_QUEUE_SIZE = 5000
+# Fetch each new entry's article and store its main text. Off by default since it multiplies fetches.
+ARTICLE_EXTRACTION_ENABLED = os.getenv("ARTICLE_EXTRACTION_ENABLED", "false").lower() == "true"
+# New news entries waiting for article extraction. Entries beyond it are left without article text.
+EXTRACT_QUEUE_SIZE = 5000
+ARTICLE_EXTRACTION_BATCH_SIZE = 50
+MAX_IN_FLIGHT_ARTICLE_FETCHES = 50
+MAX_ARTICLE_FETCHES_PER_HOST = 2
+ARTICLE_FETCH_TIMEOUT_SECONDS = 30
+MAX_ARTICLE_DOCUMENT_BYTES = 5 * 1024 * 1024
+PIPELINE_METRICS_LOG_INTERVAL_SECONDS = 30
+# Backoff of a failed feed doubles from RETRY_BASE_DELAY up to RETRY_MAX_DELAY
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(days=1)
+# Feeds failing this many times in a row are only retried every DEAD_FEED_RETRY_INTERVAL
+DEAD_FEED_FAILURE_COUNT = 10
+DEAD_FEED_RETRY_INTERVAL = timedelta(days=7)
+# Failed feeds are retried in the same run only if their backoff expires within MAX_RETRY_WAIT
+MAX_RETRY_WAIT = timedelta(minutes=5)
+MAX_RETRY_ROUNDS = 3
+# The daily crawl holds leases on its feeds through all retry rounds so that crawl workers skip them
+DAILY_CRAWL_LEASE_DURATION = timedelta(hours=3)
+# Worker threads to parse feeds and write to db. Keep it below the sql connection pool size.
+FEED_SAVE_WORKER_NUM = 8
 
 
 def _get_rss_tag(tag: str) -> str:
@@ -81,139 +127,315 @@ class DocType(Enum):
     ATOM = "atom"
 
 
-def _parse_doc(
-    root: ET.Element, rss_feed: RssFeed, doc_type: DocType
-) -> (list[NewsEntry], set[str]):
+def _get_doc_type(element: ET.Element, rss_feed: RssFeed) -> DocType | None:
     """
-    Parse the RSS document and return a list of NewsEntry objects and a set of GUIDs.
+    Determine the doc type from an element's start tag. Returns None if the element isn't a feed root.
     """
+    if element.tag == "rss":
+        if element.get("version") != "2.0":
+            raise RuntimeError(
+                f"Error: rss with invalid version. {rss_feed.feed_url}; version = {element.attrib.get('version')}"
+            )
+        return DocType.RSS
+    if element.tag == get_atom_tag("feed"):
+        return DocType.ATOM
+    return None
 
-    if doc_type == DocType.RSS and root.get("version") != "2.0":
-        raise RuntimeError(
-            f"Error: rss with invalid version. {rss_feed.feed_url}; version = {root.attrib.get('version')}"
-        )
+
+def _to_utc(time: datetime) -> datetime:
+    """
+    Convert to an aware UTC datetime. Naive datetimes are treated as local time.
+    """
+    return time.astimezone(timezone.utc)
+
+
+# Remembers the publish date format of each feed across crawls of a long running process
+_pub_date_parser_by_feed_id: dict[int, PubDateParser] = {}
+
+
+def _get_stale_before_time(rss_feed: RssFeed) -> datetime:
+    """
+    Entries published before this time are either out of the crawl window or were already crawled last time.
+    """
+    window_start = datetime.combine(
+        (datetime.now(timezone.utc) - CRAWL_WINDOW).date(),
+        datetime.min.time(),
+        tzinfo=timezone.utc,
+    )
+    if rss_feed.last_crawl_time is None:
+        return window_start
+    return max(
+        window_start, _to_utc(rss_feed.last_crawl_time) - LAST_CRAWL_GRACE_PERIOD
+    )
+
+
+def _parse_item(
+    item: ET.Element,
+    rss_feed: RssFeed,
+    doc_type: DocType,
+    pub_date_parser: PubDateParser,
+    crawl_time: datetime,
+) -> dict:
+    """
+    Parse an RSS item or Atom entry into a news entry row for bulk insert.
+    Items without a parsable publish time are taken as published at crawl_time.
+    """
     tag_modifier = _get_rss_tag if doc_type == DocType.RSS else get_atom_tag
-    items = (
-        root.findall(f".//{tag_modifier("item")}")
+    news_entry = {
+        "rss_feed_id": rss_feed.id,
+        "entry_rss_guid": None,
+        "entry_url": None,
+        "crawl_time": crawl_time,
+        "title": None,
+        "description": None,
+        "content": None,
+        "raw_description": None,
+        "raw_content": None,
+        "pub_time": None,
+    }
+    title = item.find(tag_modifier("title"))
+    if _element_has_text(title):
+        news_entry["title"] = title.text.strip()
+    else:
+        logger.warning("Error: rss item with no title")
+
+    link = item.find(tag_modifier("link"))
+    if _element_has_text(link):
+        news_entry["entry_url"] = link.text
+    description = (
+        item.find(tag_modifier("description"))
         if doc_type == DocType.RSS
-        else root.findall(f".//{tag_modifier('entry')}")
+        else item.find(tag_modifier("summary"))
     )
+    if _element_has_text(description):
+        news_entry["description"] = description.text.strip()
+    if doc_type == DocType.ATOM:
+        content = item.find(tag_modifier("content"))
+        if (
+            content is not None
+            and content.text is not None
+            and content.text.strip() != ""
+        ):
+            news_entry["content"] = content.text.strip()
+    guid = (
+        item.find(tag_modifier("guid"))
+        if doc_type == DocType.RSS
+        else item.find(tag_modifier("id"))
+    )
+    if _element_has_text(guid):
+        news_entry["entry_rss_guid"] = guid.text
+    elif _element_has_text(title):
+        news_entry["entry_rss_guid"] = news_entry["title"]
+    elif _element_has_text(link):
+        news_entry["entry_rss_guid"] = link.text
+    pub_date = item.find(tag_modifier("pubDate"))
+    published = item.find(tag_modifier("published"))
+    if _element_has_text(pub_date):
+        pub_date_text = pub_date.text
+    elif _element_has_text(published):
+        pub_date_text = published.text
+    else:
+        pub_date_text = None
+    if pub_date_text is not None:
+        try:
+            news_entry["pub_time"] = pub_date_parser.parse(pub_date_text)
+        except Exception as e:
+            logger.warning(f"Error parsing pubDate: {e}")
+            news_entry["pub_time"] = crawl_time
+    else:
+        news_entry["pub_time"] = crawl_time
+    _normalize_news_entry_text(news_entry)
+    news_entry.update(get_news_entry_fingerprints(news_entry))
+    return news_entry
+
+
+def _normalize_news_entry_text(news_entry: dict):
+    """
+    Replace HTML in description and content with plain text. The original is kept in the raw_ columns
+    only if normalization changed it.
+    """
+    for field in ("description", "content"):
+        raw_text = news_entry[field]
+        news_entry[field] = html_to_text(raw_text)
+        if news_entry[field] != raw_text:
+            news_entry[f"raw_{field}"] = raw_text
+
+
+def _get_saved_token_count(news_entry_rows: list[dict]) -> (int, int):
+    """
+    Estimated tokens of description and content before and after normalization.
+    """
+    raw_token_count = 0
+    normalized_token_count = 0
+    for row in news_entry_rows:
+        for field in ("description", "content"):
+            normalized_token_count += estimate_token_count(row[field])
+            raw_text = row[f"raw_{field}"] if row[f"raw_{field}"] is not None else row[field]
+            raw_token_count += estimate_token_count(raw_text)
+    return raw_token_count, normalized_token_count
+
+
+def parse_doc(
+    content: bytes,
+    rss_feed: RssFeed,
+    stale_before: datetime | None = None,
+    crawl_time: datetime | None = None,
+) -> list[dict]:
+    """
+    Incrementally parse the RSS document and return a list of news entry rows.
+    Items are streamed one by one and freed after parsing. Items published before stale_before, which defaults to
+    the feed's last crawl or the crawl window, are skipped. Most feeds list items from newest to oldest, so parsing
+    stops after several consecutive stale items, but only while every item so far came in that order. A feed
+    listing items in any other order is parsed to the end. crawl_time defaults to now and is the time the document
+    was fetched.
+    """
+    if stale_before is None:
+        stale_before = _get_stale_before_time(rss_feed)
+    if crawl_time is None:
+        crawl_time = datetime.now()
+    pub_date_parser = _pub_date_parser_by_feed_id.setdefault(rss_feed.id, PubDateParser())
+    doc_type = None
+    item_tag = None
     news_entries = []
-    guid_set = set()
-    for item in items:
-        news_entry = NewsEntry(rss_feed_id=rss_feed.id, crawl_time=datetime.now())
-        title = item.find(tag_modifier("title"))
-        if _element_has_text(title):
-            news_entry.title = title.text.strip()
-        else:
-            logger.warning("Error: rss item with no title")
-
-        link = item.find(tag_modifier("link"))
-        if _element_has_text(link):
-            news_entry.entry_url = link.text
-        description = (
-            item.find(tag_modifier("description"))
-            if doc_type == DocType.RSS
-            else item.find(tag_modifier("summary"))
-        )
-        if _element_has_text(description):
-            news_entry.description = description.text.strip()
-        if doc_type == DocType.ATOM:
-            content = item.find(tag_modifier("content"))
-            if (
-                content is not None
-                and content.text is not None
-                and content.text.strip() != ""
-            ):
-                news_entry.content = content.text.strip()
-        guid = (
-            item.find(tag_modifier("guid"))
-            if doc_type == DocType.RSS
-            else item.find(tag_modifier("id"))
-        )
-        if _element_has_text(guid):
-            news_entry.entry_rss_guid = guid.text
-            guid_set.add(guid.text)
-        elif _element_has_text(title):
-            news_entry.entry_rss_guid = news_entry.title
-            guid_set.add(news_entry.title)
-        elif _element_has_text(link):
-            news_entry.entry_rss_guid = link.text
-            guid_set.add(link.text)
-        pub_date = item.find(tag_modifier("pubDate"))
-        published = item.find(tag_modifier("published"))
-        if _element_has_text(pub_date):
-            pub_date_text = pub_date.text
-        elif _element_has_text(published):
-            pub_date_text = published.text
-        else:
-            pub_date_text = None
-        if pub_date_text is not None:
-            try:
-                news_entry.pub_time = parser.parse(pub_date_text)
-            except Exception as e:
-                logger.warning(f"Error parsing pubDate: {e}")
-                news_entry.pub_time = datetime.now()
-        else:
-            news_entry.pub_time = datetime.now()
+    stale_item_count = 0
+    newest_first = True
+    previous_pub_time = None
+    for event, element in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+        if event == "start":
+            if doc_type is None:
+                doc_type = _get_doc_type(element, rss_feed)
+                if doc_type is not None:
+                    item_tag = "item" if doc_type == DocType.RSS else get_atom_tag("entry")
+            continue
+        if element.tag != item_tag:
+            continue
+        news_entry = _parse_item(element, rss_feed, doc_type, pub_date_parser, crawl_time)
+        element.clear()
+        pub_time = _to_utc(news_entry["pub_time"])
+        if newest_first and previous_pub_time is not None and pub_time > previous_pub_time:
+            newest_first = False
+            logger.info(f"Feed {rss_feed.feed_url} doesn't list items newest first. Parse all of its items.")
+        previous_pub_time = pub_time
+        if pub_time < stale_before:
+            stale_item_count += 1
+            if newest_first and stale_item_count >= MAX_CONSECUTIVE_STALE_ITEMS:
+                logger.info(f"Stop parsing stale items of feed {rss_feed.feed_url}")
+                break
+            continue
+        stale_item_count = 0
         news_entries.append(news_entry)
-    return news_entries, guid_set
+    if doc_type is None:
+        raise RuntimeError("Failed to determine doc type")
+    return news_entries
 
 
-def _fetch_feed_content(rss_feed: RssFeed) -> str:
+class FeedFetchResult:
     """
-    Fetch the content of the RSS feed.
+    Result of fetching a feed. content is None if the feed is not modified since the last crawl.
     """
-    with SqlSessionLocal() as sql_client:
-        rss_feed = sql_client.query(RssFeed).filter(RssFeed.id == rss_feed.id).first()
-        headers = {"User-Agent": HTTP_HEADER_USER_AGENT}
-        response = requests.get(rss_feed.feed_url, timeout=120, headers=headers)
-        if response.status_code >= 400 and response.reason == "Not Found":
-            response = requests.get(rss_feed.html_url, timeout=120)
-            rss_feed.feed_url = rss_feed.html_url
-        response.raise_for_status()  # Raise an error for bad responses
-        content_type = response.headers.get("Content-Type", "")
-        if not is_valid_rss_type(content_type):
-            raise RuntimeError(
-                f"Error: Bad rss type for rss {rss_feed.feed_url}. Actual content type {response.headers.get('Content-Type')}"
-            )
-        if sql_client.is_modified(rss_feed):
-            sql_client.commit()
 
-    return response.text
+    def __init__(
+        self,
+        feed_url: str,
+        content: bytes | None,
+        etag: str | None,
+        last_modified: str | None,
+        downloaded_bytes: int = 0,
+    ):
+        self.feed_url = feed_url
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.downloaded_bytes = downloaded_bytes
+        # news entry rows parsed from content
+        self.news_entry_rows: list[dict] = []
+        # estimated tokens removed from the rows' description and content by HTML normalization
+        self.saved_token_count = 0
 
+    @property
+    def not_modified(self) -> bool:
+        return self.content is None
 
-def crawl_rss_feed(rss_feed: RssFeed):
-    response_text = _fetch_feed_content(rss_feed)
-    doc_root = _find_doc_root(ET.fromstring(response_text))
 
-    if doc_root.rss_root is not None:
-        doc_type = DocType.RSS
-        doc_root_obj = doc_root.rss_root
-    elif doc_root.atom_feed_root is not None:
-        doc_type = DocType.ATOM
-        doc_root_obj = doc_root.atom_feed_root
+def _get_conditional_get_headers(rss_feed: RssFeed) -> dict[str, str]:
+    headers = {}
+    if rss_feed.etag:
+        headers["If-None-Match"] = rss_feed.etag
+    if rss_feed.last_modified:
+        headers["If-Modified-Since"] = rss_feed.last_modified
+    return headers
 
-    news_entries, guid_set = _parse_doc(doc_root_obj, rss_feed, doc_type)
-    # always create a new session for parallel execution
-    sql_session = SqlSessionLocal()
-    existing_guids = (
-        sql_session.query(NewsEntry.entry_rss_guid)
-        .filter(NewsEntry.entry_rss_guid.in_(guid_set))
-        .all()
+
+async def _fetch_feed_content(
+    fetcher: AsyncHttpFetcher, rss_feed: RssFeed
+) -> FeedFetchResult:
+    """
+    Fetch the content of the RSS feed with a conditional GET based on the validators saved from last crawl.
+    Falls back to the html url if the feed url is gone.
+    """
+    feed_url = rss_feed.feed_url
+    response = await fetcher.get(
+        feed_url,
+        headers=_get_conditional_get_headers(rss_feed),
+        max_content_bytes=MAX_FEED_DOCUMENT_BYTES,
     )
-    existing_guids = set(guid[0] for guid in existing_guids)
-    news_entries = [
-        entry
-        for entry in news_entries
-        if entry.entry_rss_guid not in existing_guids
-        and (
-            entry.pub_time is None
-            or entry.pub_time.date() >= (datetime.now(timezone.utc) - timedelta(days=7)).date()
+    if response.status_code == 304:
+        return FeedFetchResult(
+            feed_url=feed_url,
+            content=None,
+            etag=response.headers.get("ETag", rss_feed.etag),
+            last_modified=response.headers.get("Last-Modified", rss_feed.last_modified),
         )
-    ]
-    sql_session.add_all(news_entries)
-    sql_session.commit()
+    if response.status_code >= 400 and response.reason_phrase == "Not Found":
+        feed_url = rss_feed.html_url
+        response = await fetcher.get(
+            feed_url, max_content_bytes=MAX_FEED_DOCUMENT_BYTES
+        )
+    response.raise_for_status()  # Raise an error for bad responses
+    content_type = response.headers.get("Content-Type", "")
+    if not is_valid_rss_type(content_type):
+        raise RuntimeError(
+            f"Error: Bad rss type for rss {feed_url}. Actual content type {response.headers.get('Content-Type')}"
+        )
+    return FeedFetchResult(
+        feed_url=feed_url,
+        content=response.content,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        downloaded_bytes=len(response.content),
+    )
+
+
+def _archive_and_parse_doc(content: bytes, rss_feed: RssFeed) -> list[dict]:
+    try:
+        archive_feed_body(rss_feed.id, rss_feed.feed_url, datetime.now(), content)
+    except Exception as e:
+        # The archive only serves reparsing so it must never fail a crawl
+        logger.warning(f"Error archiving feed {rss_feed.feed_url}: {e}")
+    return parse_doc(content, rss_feed)
+
+
+async def crawl_rss_feed(
+    fetcher: AsyncHttpFetcher, executor: ThreadPoolExecutor, rss_feed: RssFeed
+) -> FeedFetchResult:
+    fetch_result = await _fetch_feed_content(fetcher, rss_feed)
+    if fetch_result.not_modified:
+        # Nothing changed since last crawl. Skip parsing.
+        return fetch_result
+    # Parsing is CPU bound so it runs in a worker thread instead of the event loop.
+    fetch_result.news_entry_rows = await asyncio.get_running_loop().run_in_executor(
+        executor, _archive_and_parse_doc, fetch_result.content, rss_feed
+    )
+    # Release the raw document as soon as it is parsed
+    fetch_result.content = b""
+    raw_token_count, normalized_token_count = _get_saved_token_count(fetch_result.news_entry_rows)
+    fetch_result.saved_token_count = raw_token_count - normalized_token_count
+    if fetch_result.saved_token_count > 0:
+        logger.info(
+            f"Normalizing feed {rss_feed.feed_url} saved ~{fetch_result.saved_token_count} of {raw_token_count} tokens "
+            f"({fetch_result.saved_token_count / raw_token_count:.0%})."
+        )
+    return fetch_result
 
 
 def get_subscribed_feed_ids():
@@ -257,74 +479,757 @@ def get_subscribed_feed_ids():
     return list(subscribed_feed_ids)
 
 
-def crawl_news() -> int:
-    subscribed_feed_ids = get_subscribed_feed_ids()
-    sql_session = get_sql_db()
-    # Get today's date at midnight (beginning of the day)
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+def _update_feed_crawl_status(sql_session: Session, feed_status_rows: list[dict]) -> list[int]:
+    """
+    Update crawl status of many feeds with a single UPDATE ... FROM (VALUES ...) statement.
+    Successful feeds get new crawl time and validators. Failed feeds get the error recorded and back off.
+    A row failing the statement, e.g. a feed url already taken by another feed, would fail the whole batch, so the
+    batch is retried in halves within savepoints until the offending feeds are found. Those are marked failed.
+    Returns ids of feeds marked failed that way.
+    """
+    if not feed_status_rows:
+        return []
+    try:
+        with sql_session.begin_nested():
+            __execute_feed_status_update(sql_session, feed_status_rows)
+        return []
+    except DBAPIError as e:
+        if len(feed_status_rows) == 1:
+            feed_id = feed_status_rows[0]["id"]
+            logger.error(f"Error updating crawl status of feed {feed_id}: {e}")
+            with sql_session.begin_nested():
+                __mark_feed_status_failed(sql_session, feed_id, e)
+            return [feed_id]
+    middle = len(feed_status_rows) // 2
+    return _update_feed_crawl_status(sql_session, feed_status_rows[:middle]) + _update_feed_crawl_status(
+        sql_session, feed_status_rows[middle:]
+    )
 
-    rss_feeds = (
-        sql_session.query(RssFeed)
-        .filter(
-            RssFeed.id.in_(subscribed_feed_ids),
-            (RssFeed.last_crawl_time == None) | (RssFeed.last_crawl_time < today),
+
+def __mark_feed_status_failed(sql_session: Session, feed_id: int, error: Exception):
+    consecutive_failure_count = (
+        sql_session.query(RssFeed.consecutive_failure_count).filter(RssFeed.id == feed_id).scalar() or 0
+    ) + 1
+    sql_session.execute(
+        update(RssFeed)
+        .where(RssFeed.id == feed_id)
+        .values(
+            last_error=f"{type(error).__name__}: {error}"[:MAX_FEED_ERROR_LENGTH],
+            consecutive_failure_count=consecutive_failure_count,
+            next_attempt_at=_get_next_attempt_time(consecutive_failure_count),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def __execute_feed_status_update(sql_session: Session, feed_status_rows: list[dict]):
+    feed_status = values(
+        column("id", Integer),
+        column("succeeded", Boolean),
+        column("crawl_time", DateTime),
+        column("feed_url", String),
+        column("etag", String),
+        column("last_modified", String),
+        column("not_modified", Integer),
+        column("error", String),
+        column("next_attempt_at", DateTime),
+        name="feed_status",
+    ).data(
+        [
+            (
+                row["id"],
+                row["succeeded"],
+                row["crawl_time"],
+                row["feed_url"],
+                row["etag"],
+                row["last_modified"],
+                row["not_modified"],
+                row["error"],
+                row["next_attempt_at"],
+            )
+            for row in feed_status_rows
+        ]
+    )
+    succeeded = feed_status.c.succeeded
+    sql_session.execute(
+        update(RssFeed)
+        .where(RssFeed.id == feed_status.c.id)
+        .values(
+            last_crawl_time=case(
+                (succeeded, feed_status.c.crawl_time), else_=RssFeed.last_crawl_time
+            ),
+            feed_url=feed_status.c.feed_url,
+            etag=case(
+                (succeeded, cast(feed_status.c.etag, String)), else_=RssFeed.etag
+            ),
+            last_modified=case(
+                (succeeded, cast(feed_status.c.last_modified, String)),
+                else_=RssFeed.last_modified,
+            ),
+            fetch_count=func.coalesce(RssFeed.fetch_count, 0)
+            + case((succeeded, 1), else_=0),
+            not_modified_count=func.coalesce(RssFeed.not_modified_count, 0)
+            + feed_status.c.not_modified,
+            last_error=cast(feed_status.c.error, String),
+            consecutive_failure_count=case(
+                (succeeded, 0),
+                else_=func.coalesce(RssFeed.consecutive_failure_count, 0) + 1,
+            ),
+            next_attempt_at=case(
+                (succeeded, None),
+                else_=cast(feed_status.c.next_attempt_at, DateTime),
+            ),
+        )
+    )
+
+
+def _get_next_attempt_time(consecutive_failure_count: int) -> datetime:
+    """
+    Exponential backoff with jitter based on the number of consecutive failures.
+    Chronically dead feeds are demoted to a long fixed retry interval.
+    """
+    if consecutive_failure_count >= DEAD_FEED_FAILURE_COUNT:
+        delay = DEAD_FEED_RETRY_INTERVAL
+    else:
+        delay = min(
+            RETRY_BASE_DELAY * 2 ** (consecutive_failure_count - 1), RETRY_MAX_DELAY
+        )
+    # Jitter so that failed feeds of the same host don't retry in lockstep
+    return datetime.now() + delay * random.uniform(0.5, 1.0)
+
+
+def _get_failure_status_row(
+    feed_id: int, feed_url: str, previous_failure_count: int | None, error: Exception
+) -> dict:
+    consecutive_failure_count = (previous_failure_count or 0) + 1
+    if consecutive_failure_count == DEAD_FEED_FAILURE_COUNT:
+        logger.warning(
+            f"Feed {feed_url} failed {consecutive_failure_count} times in a row. Demote it to retry every {DEAD_FEED_RETRY_INTERVAL}."
+        )
+    return {
+        "id": feed_id,
+        "succeeded": False,
+        "crawl_time": datetime.now(),
+        "feed_url": feed_url,
+        "etag": None,
+        "last_modified": None,
+        "not_modified": 0,
+        "error": f"{type(error).__name__}: {error}"[:MAX_FEED_ERROR_LENGTH],
+        "next_attempt_at": _get_next_attempt_time(consecutive_failure_count),
+    }
+
+
+class CrawlResultBuffer:
+    """
+    Buffers crawl results so that news entries and feed status of many feeds are written together.
+    News entries are inserted with one statement and feed status is updated with another one in the same
+    transaction, so a feed is only marked as crawled once its entries are persisted.
+    The buffer should be flushed when it holds enough entries or feeds, or its oldest result waited too long.
+    """
+
+    def __init__(self, max_entry_count: int, max_feed_count: int, max_wait_seconds: float):
+        self.__max_entry_count = max_entry_count
+        self.__max_feed_count = max_feed_count
+        self.__max_wait_seconds = max_wait_seconds
+        self.__news_entry_rows: list[dict] = []
+        self.__feed_status_rows: list[dict] = []
+        self.__first_result_time = None
+
+    def add_success(self, rss_feed: RssFeed, fetch_result: FeedFetchResult):
+        self.__news_entry_rows.extend(fetch_result.news_entry_rows)
+        self.__add_feed_status(
+            {
+                "id": rss_feed.id,
+                "succeeded": True,
+                "crawl_time": datetime.now(),
+                "feed_url": fetch_result.feed_url,
+                "etag": fetch_result.etag,
+                "last_modified": fetch_result.last_modified,
+                "not_modified": 1 if fetch_result.not_modified else 0,
+                "error": None,
+                "next_attempt_at": None,
+            }
+        )
+
+    def add_failure(self, rss_feed: RssFeed, error: Exception):
+        self.__add_feed_status(
+            _get_failure_status_row(
+                rss_feed.id, rss_feed.feed_url, rss_feed.consecutive_failure_count, error
+            )
+        )
+
+    def __add_feed_status(self, feed_status_row: dict):
+        if self.__first_result_time is None:
+            self.__first_result_time = time.monotonic()
+        self.__feed_status_rows.append(feed_status_row)
+
+    def should_flush(self) -> bool:
+        if self.is_empty():
+            return False
+        return (
+            len(self.__news_entry_rows) >= self.__max_entry_count
+            or len(self.__feed_status_rows) >= self.__max_feed_count
+            or time.monotonic() - self.__first_result_time >= self.__max_wait_seconds
+        )
+
+    def is_empty(self) -> bool:
+        return not self.__feed_status_rows
+
+    def drain(self) -> (list[dict], list[dict]):
+        news_entry_rows, feed_status_rows = self.__news_entry_rows, self.__feed_status_rows
+        self.__news_entry_rows = []
+        self.__feed_status_rows = []
+        self.__first_result_time = None
+        return news_entry_rows, feed_status_rows
+
+
+def _persist_crawl_results(
+    news_entry_rows: list[dict],
+    feed_status_rows: list[dict],
+    near_duplicate_index: NearDuplicateIndex,
+) -> (list[int], list[int]):
+    """
+    Bulk insert the news entries of crawled feeds and update the feeds' crawl status in one transaction.
+    Returns ids of newly inserted news entries and ids of feeds whose crawl status failed to update.
+    """
+    with SqlSessionLocal() as sql_session:
+        new_news_entry_ids = bulk_insert_news_entries(
+            sql_session, news_entry_rows, near_duplicate_index
+        )
+        status_failed_feed_ids = _update_feed_crawl_status(sql_session, feed_status_rows)
+        sql_session.commit()
+    return new_news_entry_ids, status_failed_feed_ids
+
+
+def _record_persist_failure(feed_status_rows: list[dict], error: Exception):
+    """
+    Back off every feed of a batch whose results failed to persist, in a transaction of its own since the failed
+    one rolled back their crawl status. Without it retry_failed_feeds and later runs wouldn't pick them up.
+    Feeds which already failed to crawl keep their crawl error.
+    """
+    feed_ids = [row["id"] for row in feed_status_rows if row["succeeded"]]
+    with SqlSessionLocal() as sql_session:
+        previous_failure_counts = dict(
+            sql_session.query(RssFeed.id, RssFeed.consecutive_failure_count)
+            .filter(RssFeed.id.in_(feed_ids))
+            .all()
+        )
+        _update_feed_crawl_status(
+            sql_session,
+            [
+                (
+                    _get_failure_status_row(
+                        row["id"], row["feed_url"], previous_failure_counts.get(row["id"]), error
+                    )
+                    if row["succeeded"]
+                    else row
+                )
+                for row in feed_status_rows
+            ],
+        )
+        sql_session.commit()
+
+
+def _load_near_duplicate_index() -> NearDuplicateIndex:
+    with SqlSessionLocal() as sql_session:
+        return load_near_duplicate_index(sql_session)
+
+
+async def _crawl_rss_feed_and_catch_error(
+    fetcher: AsyncHttpFetcher, executor: ThreadPoolExecutor, rss_feed: RssFeed
+) -> (RssFeed, FeedFetchResult | None, Exception | None):
+    try:
+        fetch_result = await crawl_rss_feed(fetcher, executor, rss_feed)
+        return rss_feed, fetch_result, None
+    except Exception as e:
+        logger.error(f"Error crawling feed {rss_feed.feed_url}: {e}")
+        logger.error(f"Stack trace: {traceback.format_exc()}")
+        return rss_feed, None, e
+
+
+class PipelineStageMetrics:
+    """
+    Throughput of a crawl pipeline stage. Stages working on many items at once, like the crawl stage, have no
+    meaningful busy time and don't track it.
+    """
+
+    def __init__(self, name: str, tracks_busy_time: bool = True):
+        self.name = name
+        self.tracks_busy_time = tracks_busy_time
+        self.item_count = 0
+        self.busy_seconds = 0.0
+
+    def record(self, item_count: int, busy_seconds: float = 0.0):
+        self.item_count += item_count
+        self.busy_seconds += busy_seconds
+
+    def describe(self, elapsed_seconds: float) -> str:
+        elapsed_seconds = max(elapsed_seconds, 1e-9)
+        description = f"{self.name} {self.item_count} items ({self.item_count / elapsed_seconds:.1f}/s"
+        if self.tracks_busy_time:
+            description += f", busy {self.busy_seconds / elapsed_seconds:.0%}"
+        return description + ")"
+
+
+async def _crawl_and_enqueue(
+    fetcher: AsyncHttpFetcher,
+    executor: ThreadPoolExecutor,
+    rss_feed: RssFeed,
+    crawl_result_queue: asyncio.Queue,
+    metrics: PipelineStageMetrics,
+):
+    crawl_result = await _crawl_rss_feed_and_catch_error(fetcher, executor, rss_feed)
+    metrics.record(1)
+    # Blocks when the persist stage falls behind so that parsed entries don't pile up in memory
+    await crawl_result_queue.put(crawl_result)
+
+
+async def _run_crawl_stage(
+    rss_feeds: list[RssFeed],
+    executor: ThreadPoolExecutor,
+    crawl_result_queue: asyncio.Queue,
+    metrics: PipelineStageMetrics,
+):
+    """
+    Fetch and parse the feeds. Concurrency is bounded by the fetcher's global and per host limits.
+    """
+    async with AsyncHttpFetcher(
+        max_in_flight=MAX_IN_FLIGHT_FEED_FETCHES,
+        max_per_host=MAX_FEED_FETCHES_PER_HOST,
+        timeout=FEED_FETCH_TIMEOUT_SECONDS,
+        headers={"User-Agent": HTTP_HEADER_USER_AGENT},
+    ) as fetcher:
+        await asyncio.gather(
+            *(
+                _crawl_and_enqueue(fetcher, executor, rss_feed, crawl_result_queue, metrics)
+                for rss_feed in rss_feeds
+            )
         )
-        .yield_per(SQL_BATCH_SIZE)
+    await crawl_result_queue.put(None)
+
+
+async def _run_persist_stage(
+    executor: ThreadPoolExecutor,
+    crawl_result_queue: asyncio.Queue,
+    downstream_queues: list[asyncio.Queue],
+    metrics: PipelineStageMetrics,
+) -> list[int]:
+    """
+    Dedupe and persist crawl results in batches and pass new news entry ids on to the embed and extract stages.
+    Unlike the crawl stage it never waits on later stages, since unembedded entries can be backfilled from the DB
+    and article text is optional.
+    Returns ids of feeds that failed.
+    """
+    loop = asyncio.get_running_loop()
+    start_time = time.monotonic()
+    near_duplicate_index = await loop.run_in_executor(executor, _load_near_duplicate_index)
+    success_count = 0
+    error_count = 0
+    not_modified_count = 0
+    downloaded_bytes = 0
+    saved_token_count = 0
+    new_news_entry_count = 0
+    downstream_overflow_count = 0
+    failed_feed_ids = []
+    result_buffer = CrawlResultBuffer(
+        max_entry_count=NEWS_ENTRY_INGEST_BATCH_SIZE,
+        max_feed_count=FEED_STATUS_FLUSH_SIZE,
+        max_wait_seconds=CRAWL_RESULT_FLUSH_INTERVAL_SECONDS,
     )
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        # Use a thread pool to crawl multiple RSS feeds concurrently
-        future_to_feed = {
-            executor.submit(crawl_rss_feed, rss_feed): rss_feed
-            for rss_feed in rss_feeds
-        }
-        logger.info(f"Total feeds to crawl: {len(future_to_feed)}")
-        finished_count = 0
-        success_count = 0
-        error_count = 0
-        # Wait for all futures to complete
-        for future in as_completed(future_to_feed.keys()):
-            rss_feed = future_to_feed[future]
+    crawl_done = False
+    while not crawl_done or not result_buffer.is_empty():
+        if not crawl_done:
             try:
-                future.result()  # This will raise an exception if the thread failed
-                success_count += 1
-                # Update last_crawl_time in a separate session
-                update_session = SqlSessionLocal()
+                # Wake up periodically so that buffered results are flushed even when fetches are slow
+                crawl_result = await asyncio.wait_for(
+                    crawl_result_queue.get(), timeout=CRAWL_RESULT_FLUSH_INTERVAL_SECONDS
+                )
+                if crawl_result is None:
+                    crawl_done = True
+                else:
+                    rss_feed, fetch_result, error = crawl_result
+                    if error is None:
+                        if fetch_result.not_modified:
+                            not_modified_count += 1
+                        downloaded_bytes += fetch_result.downloaded_bytes
+                        saved_token_count += fetch_result.saved_token_count
+                        result_buffer.add_success(rss_feed, fetch_result)
+                    else:
+                        error_count += 1
+                        failed_feed_ids.append(rss_feed.id)
+                        result_buffer.add_failure(rss_feed, error)
+            except asyncio.TimeoutError:
+                pass
+        if result_buffer.is_empty() or (not crawl_done and not result_buffer.should_flush()):
+            continue
+        news_entry_rows, feed_status_rows = result_buffer.drain()
+        crawled_feed_count = sum(1 for row in feed_status_rows if row["succeeded"])
+        persist_start_time = time.monotonic()
+        try:
+            # Persist off the event loop so that fetches keep flowing
+            new_news_entry_ids, status_failed_feed_ids = await loop.run_in_executor(
+                executor,
+                _persist_crawl_results,
+                news_entry_rows,
+                feed_status_rows,
+                near_duplicate_index,
+            )
+            # Feeds which already failed to crawl are counted and listed as failed
+            succeeded_feed_ids = {row["id"] for row in feed_status_rows if row["succeeded"]}
+            status_failed_feed_ids = [
+                feed_id for feed_id in status_failed_feed_ids if feed_id in succeeded_feed_ids
+            ]
+            success_count += crawled_feed_count - len(status_failed_feed_ids)
+            error_count += len(status_failed_feed_ids)
+            failed_feed_ids.extend(status_failed_feed_ids)
+        except Exception as e:
+            logger.error(
+                f"Error saving {len(news_entry_rows)} news entries of {len(feed_status_rows)} feeds: {e}"
+            )
+            logger.error(f"Stack trace: {traceback.format_exc()}")
+            error_count += crawled_feed_count
+            failed_feed_ids.extend(
+                row["id"] for row in feed_status_rows if row["succeeded"]
+            )
+            new_news_entry_ids = []
+            try:
+                await loop.run_in_executor(
+                    executor, _record_persist_failure, feed_status_rows, e
+                )
+            except Exception as backoff_error:
+                logger.error(
+                    f"Error recording backoff of {len(feed_status_rows)} feeds: {backoff_error}"
+                )
+        metrics.record(len(news_entry_rows), time.monotonic() - persist_start_time)
+        new_news_entry_count += len(new_news_entry_ids)
+        for downstream_queue in downstream_queues:
+            for news_entry_id in new_news_entry_ids:
+                try:
+                    downstream_queue.put_nowait(news_entry_id)
+                except asyncio.QueueFull:
+                    # Slow later stages must not hold up crawling
+                    downstream_overflow_count += 1
+    for downstream_queue in downstream_queues:
+        await downstream_queue.put(None)
+    logger.info(
+        f"success count {success_count} error count {error_count}. new news entry count {new_news_entry_count}. took {time.monotonic() - start_time:.1f} seconds."
+    )
+    logger.info(
+        f"not modified count {not_modified_count} ({not_modified_count / max(success_count, 1):.1%} of success). downloaded {downloaded_bytes} bytes."
+    )
+    logger.info(f"HTML normalization saved ~{saved_token_count} tokens.")
+    if downstream_overflow_count:
+        logger.warning(
+            f"{downstream_overflow_count} new news entries overflowed the embed or extract queue. Embeddings are left to backfill."
+        )
+    return failed_feed_ids
+
+
+def _embed_news_entries(news_entry_ids: list[int]) -> int:
+    """
+    Embed the canonical entries among the ids. Duplicates reuse their canonical entry's embeddings later.
+    """
+    with SqlSessionLocal() as sql_session:
+        news_entries = (
+            sql_session.query(NewsEntry.id, NewsEntry.title, NewsEntry.description, NewsEntry.content)
+            .filter(
+                NewsEntry.id.in_(news_entry_ids),
+                NewsEntry.duplicate_of_id.is_(None),
+                NewsEntry.summary_clustering_embedding.is_(None),
+            )
+            .all()
+        )
+        for batch_news_entries, embedding_inputs in pack_embedding_batches(
+            news_entries, [get_embedding_input(news_entry) for news_entry in news_entries]
+        ):
+            clustering_embedding, document_retrieval_embedding = embed_texts(embedding_inputs)
+            save_news_entry_embeddings(
+                sql_session,
+                [news_entry.id for news_entry in batch_news_entries],
+                clustering_embedding,
+                document_retrieval_embedding,
+            )
+        sql_session.commit()
+    return len(news_entries)
+
+
+def _copy_canonical_embedding():
+    with SqlSessionLocal() as sql_session:
+        copy_canonical_embedding(sql_session)
+
+
+async def _run_embed_stage(
+    executor: ThreadPoolExecutor,
+    embed_queue: asyncio.Queue,
+    metrics: PipelineStageMetrics,
+):
+    """
+    Embed new news entries as soon as they are persisted. The client's rate limiter keeps requests within the quota.
+    Entries failing here are left to backfill_embedding.
+    """
+    loop = asyncio.get_running_loop()
+    embed_done = False
+    while not embed_done:
+        news_entry_id = await embed_queue.get()
+        if news_entry_id is None:
+            break
+        news_entry_ids = [news_entry_id]
+        # Take whatever else is already queued up to a full batch instead of waiting for more
+        while len(news_entry_ids) < EMBEDDING_RATE_LIMIT and not embed_queue.empty():
+            news_entry_id = embed_queue.get_nowait()
+            if news_entry_id is None:
+                embed_done = True
+                break
+            news_entry_ids.append(news_entry_id)
+        embed_start_time = time.monotonic()
+        try:
+            embedded_count = await loop.run_in_executor(
+                executor, _embed_news_entries, news_entry_ids
+            )
+        except Exception as e:
+            logger.error(f"Error embedding {len(news_entry_ids)} news entries: {e}")
+            logger.error(f"Stack trace: {traceback.format_exc()}")
+            embedded_count = 0
+        metrics.record(embedded_count, time.monotonic() - embed_start_time)
+    try:
+        await loop.run_in_executor(executor, _copy_canonical_embedding)
+    except Exception as e:
+        logger.error(f"Error copying embeddings to duplicate news entries: {e}")
+
+
+def _get_article_urls(news_entry_ids: list[int]) -> list[(int, str)]:
+    with SqlSessionLocal() as sql_session:
+        return (
+            sql_session.query(NewsEntry.id, NewsEntry.entry_url)
+            .filter(
+                NewsEntry.id.in_(news_entry_ids),
+                NewsEntry.duplicate_of_id.is_(None),
+                NewsEntry.entry_url.is_not(None),
+            )
+            .all()
+        )
+
+
+def _save_article_texts(article_text_rows: list[dict]):
+    with SqlSessionLocal() as sql_session:
+        sql_session.execute(update(NewsEntry), article_text_rows)
+        sql_session.commit()
+
+
+async def _fetch_article_html(fetcher: AsyncHttpFetcher, url: str) -> str | None:
+    try:
+        response = await fetcher.get(url, max_content_bytes=MAX_ARTICLE_DOCUMENT_BYTES)
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Error fetching article {url}: {e}")
+        return None
+    if "html" not in response.headers.get("Content-Type", ""):
+        return None
+    return response.text
+
+
+async def _run_extract_stage(
+    executor: ThreadPoolExecutor,
+    extract_queue: asyncio.Queue,
+    metrics: PipelineStageMetrics,
+):
+    """
+    Fetch the articles of new canonical entries and extract their main text in a process pool,
+    so that expansion and research don't have to fetch them at click time.
+    """
+    loop = asyncio.get_running_loop()
+    extract_done = False
+    async with AsyncHttpFetcher(
+        max_in_flight=MAX_IN_FLIGHT_ARTICLE_FETCHES,
+        max_per_host=MAX_ARTICLE_FETCHES_PER_HOST,
+        timeout=ARTICLE_FETCH_TIMEOUT_SECONDS,
+        headers={"User-Agent": HTTP_HEADER_USER_AGENT},
+    ) as fetcher:
+        # Extraction is CPU bound python so threads would serialize on the GIL
+        with ProcessPoolExecutor() as process_executor:
+            while not extract_done:
+                news_entry_id = await extract_queue.get()
+                if news_entry_id is None:
+                    break
+                news_entry_ids = [news_entry_id]
+                while len(news_entry_ids) < ARTICLE_EXTRACTION_BATCH_SIZE and not extract_queue.empty():
+                    news_entry_id = extract_queue.get_nowait()
+                    if news_entry_id is None:
+                        extract_done = True
+                        break
+                    news_entry_ids.append(news_entry_id)
+                extract_start_time = time.monotonic()
                 try:
-                    feed_obj = (
-                        update_session.query(RssFeed)
-                        .filter(RssFeed.id == rss_feed.id)
-                        .first()
+                    article_urls = await loop.run_in_executor(
+                        executor, _get_article_urls, news_entry_ids
                     )
-                    if feed_obj:
-                        feed_obj.last_crawl_time = datetime.now()
-                        update_session.commit()
-                except Exception as e:
-                    update_session.rollback()
-                    logger.error(
-                        f"Error updating feed timestamp {rss_feed.feed_url}: {e}"
+                    htmls = await asyncio.gather(
+                        *(_fetch_article_html(fetcher, url) for _, url in article_urls)
+                    )
+                    article_texts = await asyncio.gather(
+                        *(
+                            loop.run_in_executor(process_executor, extract_article_text, html)
+                            for html in htmls
+                            if html is not None
+                        )
                     )
-                finally:
-                    update_session.close()
-            except Exception as e:
-                logger.error(f"Error crawling feed {rss_feed.feed_url}: {e}")
-                error_count += 1
-                logger.error(f"Stack trace: {traceback.format_exc()}")
-            finished_count += 1
-        logger.info(f"success count {success_count} error count {error_count}.")
-        return error_count
+                    article_ids = [
+                        news_entry_id
+                        for (news_entry_id, _), html in zip(article_urls, htmls)
+                        if html is not None
+                    ]
+                    article_text_rows = [
+                        {"id": news_entry_id, "article_text": article_text}
+                        for news_entry_id, article_text in zip(article_ids, article_texts)
+                        if article_text is not None
+                    ]
+                    if article_text_rows:
+                        await loop.run_in_executor(
+                            executor, _save_article_texts, article_text_rows
+                        )
+                except Exception as e:
+                    logger.error(f"Error extracting articles of {len(news_entry_ids)} news entries: {e}")
+                    logger.error(f"Stack trace: {traceback.format_exc()}")
+                    article_text_rows = []
+                metrics.record(len(article_text_rows), time.monotonic() - extract_start_time)
+
+
+def _log_pipeline_metrics(
+    start_time: float,
+    stage_metrics: list[PipelineStageMetrics],
+    queues: dict[str, asyncio.Queue],
+):
+    elapsed_seconds = time.monotonic() - start_time
+    queue_depths = ", ".join(
+        f"{name} queue {queue.qsize()}/{queue.maxsize}" for name, queue in queues.items()
+    )
+    stage_throughputs = ", ".join(metrics.describe(elapsed_seconds) for metrics in stage_metrics)
+    logger.info(
+        f"Crawl pipeline after {elapsed_seconds:.0f}s: {stage_throughputs}. {queue_depths}. "
+        f"{embedding_cache_stats.describe()}. {embedding_input_stats.describe()}."
+    )
+
+
+async def crawl_rss_feeds(
+    rss_feeds: list[RssFeed], embed_new_entries: bool = True
+) -> list[int]:
+    """
+    Crawl the feeds through concurrent crawl -> persist -> embed stages connected by bounded queues.
+    Parsing happens within the crawl stage and dedupe within the persist stage. Without embed_new_entries
+    the embed stage is skipped and new entries are left to backfill_embedding. An extract stage fetching article
+    text runs next to the embed stage if ARTICLE_EXTRACTION_ENABLED. Returns ids of feeds that failed.
+    """
+    start_time = time.monotonic()
+    logger.info(f"Total feeds to crawl: {len(rss_feeds)}")
+    crawl_metrics = PipelineStageMetrics("crawl", tracks_busy_time=False)
+    persist_metrics = PipelineStageMetrics("persist")
+    crawl_result_queue = asyncio.Queue(maxsize=CRAWL_RESULT_QUEUE_SIZE)
+    stage_metrics = [crawl_metrics, persist_metrics]
+    queues = {"crawl result": crawl_result_queue}
+    with ThreadPoolExecutor(max_workers=FEED_SAVE_WORKER_NUM) as executor:
+        # Optional stages after persist, each fed the new news entry ids through its own queue
+        downstream_stages = []
+        if embed_new_entries:
+            embed_metrics = PipelineStageMetrics("embed")
+            queues["embed"] = asyncio.Queue(maxsize=EMBED_QUEUE_SIZE)
+            stage_metrics.append(embed_metrics)
+            downstream_stages.append(_run_embed_stage(executor, queues["embed"], embed_metrics))
+        if ARTICLE_EXTRACTION_ENABLED:
+            extract_metrics = PipelineStageMetrics("extract")
+            queues["extract"] = asyncio.Queue(maxsize=EXTRACT_QUEUE_SIZE)
+            stage_metrics.append(extract_metrics)
+            downstream_stages.append(_run_extract_stage(executor, queues["extract"], extract_metrics))
+        downstream_queues = [queue for name, queue in queues.items() if name != "crawl result"]
+        stages = asyncio.gather(
+            _run_crawl_stage(rss_feeds, executor, crawl_result_queue, crawl_metrics),
+            _run_persist_stage(executor, crawl_result_queue, downstream_queues, persist_metrics),
+            *downstream_stages,
+        )
+        while True:
+            done, _ = await asyncio.wait([stages], timeout=PIPELINE_METRICS_LOG_INTERVAL_SECONDS)
+            if done:
+                break
+            _log_pipeline_metrics(start_time, stage_metrics, queues)
+        failed_feed_ids = stages.result()[1]
+    _log_pipeline_metrics(start_time, stage_metrics, queues)
+    return failed_feed_ids
+
+
+def claim_feeds_to_crawl(lease_owner: str) -> list[RssFeed]:
+    """
+    Lease subscribed feeds which haven't been crawled today and aren't backing off from failures.
+    Feeds leased by crawl workers or the scheduler are skipped.
+    """
+    subscribed_feed_ids = get_subscribed_feed_ids()
+    if not subscribed_feed_ids:
+        return []
+    now = datetime.now()
+    # Get today's date at midnight (beginning of the day)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return claim_feeds(
+        lease_owner,
+        [
+            RssFeed.id.in_(subscribed_feed_ids),
+            (RssFeed.last_crawl_time == None) | (RssFeed.last_crawl_time < today),
+            (RssFeed.next_attempt_at == None) | (RssFeed.next_attempt_at <= now),
+        ],
+        MAX_CRAWL_FEED_NUM,
+        DAILY_CRAWL_LEASE_DURATION,
+    )
+
+
+def retry_failed_feeds(failed_feed_ids: list[int]):
+    """
+    Retry only the failed feeds whose backoff expires soon. Feeds that failed repeatedly back off for
+    hours or days, so they are left to later runs instead of holding up this one.
+    The failed feeds must still be leased by this run.
+    """
+    for _ in range(MAX_RETRY_ROUNDS):
+        if not failed_feed_ids:
+            return
+        with SqlSessionLocal() as sql_session:
+            rss_feeds = (
+                sql_session.query(RssFeed)
+                .filter(
+                    RssFeed.id.in_(failed_feed_ids),
+                    RssFeed.next_attempt_at <= datetime.now() + MAX_RETRY_WAIT,
+                )
+                .all()
+            )
+        if not rss_feeds:
+            return
+        wait_seconds = (
+            max(rss_feed.next_attempt_at for rss_feed in rss_feeds) - datetime.now()
+        ).total_seconds()
+        if wait_seconds > 0:
+            logger.info(
+                f"Sleeping for {wait_seconds:.0f} seconds before retrying {len(rss_feeds)} failed feeds..."
+            )
+            time.sleep(wait_seconds)
+        failed_feed_ids = asyncio.run(crawl_rss_feeds(rss_feeds))
 
 
 # Defining main function
 def main():
-    unfinished_count = 1
-    retry_count = 0
-    while unfinished_count > 0 and retry_count < 3:
-        unfinished_count = crawl_news()
-        retry_count += 1
-        if unfinished_count > 0:
-            logger.info("Sleeping for 1 minutes before retrying...")
-            time.sleep(60)  # Sleep for 10 minutes
-    # populate the embedding separately so that the quota won't block the crawling
+    lease_owner = get_lease_owner()
+    rss_feeds = claim_feeds_to_crawl(lease_owner)
+    try:
+        failed_feed_ids = asyncio.run(crawl_rss_feeds(rss_feeds))
+        retry_failed_feeds(failed_feed_ids)
+    finally:
+        release_feed_leases(lease_owner, [rss_feed.id for rss_feed in rss_feeds])
+    try:
+        pruned_fetch_count, deleted_body_count = prune_feed_archive()
+        logger.info(
+            f"Pruned {pruned_fetch_count} archived fetches and {deleted_body_count} feed bodies from the archive."
+        )
+    except Exception as e:
+        logger.error(f"Error pruning feed archive: {e}")
+    try:
+        logger.info(f"Pruned {prune_embedding_cache()} entries from the embedding cache.")
+    except Exception as e:
+        logger.error(f"Error pruning embedding cache: {e}")
+    # new entries are embedded while crawling. Backfill the ones left behind.
     backfill_embedding()
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.db import SqlSessionLocal
+from db.models import RssFeed, NewsEntry
+from datetime import datetime, timedelta
+from sqlalchemy import func
+import asyncio
+import heapq
+from cron.crawl_news import get_subscribed_feed_ids, crawl_rss_feeds
+from cron.feed_lease import get_lease_owner, claim_feeds, release_feed_leases
+from utils.logger import setup_logger, logger
+
+setup_logger("crawl_scheduler")
+
+# Publish rate of a feed is learned from entries published within this window
+PUBLISH_RATE_WINDOW = timedelta(days=14)
+# A feed is crawled when this many new entries are expected since its last crawl
+TARGET_NEW_ENTRIES_PER_CRAWL = 5
+MIN_CRAWL_INTERVAL = timedelta(minutes=30)
+MAX_CRAWL_INTERVAL = timedelta(days=2)
+# How often the scheduler wakes up to crawl due feeds
+SCHEDULER_TICK_SECONDS = 60
+# How often subscribed feeds and their publish rates are reloaded
+SCHEDULE_REFRESH_INTERVAL = timedelta(hours=1)
+MAX_FEEDS_PER_TICK = 500
+# A lease must outlive the crawl of a whole tick's feeds
+SCHEDULER_LEASE_DURATION = timedelta(hours=1)
+
+
+def get_publish_rates(feed_ids: list[int]) -> dict[int, float]:
+    """
+    Get the number of entries published per hour for each feed based on recent NewsEntry history.
+    Feeds without recent entries are missing from the result.
+    """
+    if not feed_ids:
+        return {}
+    window_start = datetime.now() - PUBLISH_RATE_WINDOW
+    with SqlSessionLocal() as sql_session:
+        entry_counts = (
+            sql_session.query(NewsEntry.rss_feed_id, func.count(NewsEntry.id))
+            .filter(
+                NewsEntry.rss_feed_id.in_(feed_ids),
+                func.coalesce(NewsEntry.pub_time, NewsEntry.crawl_time) >= window_start,
+            )
+            .group_by(NewsEntry.rss_feed_id)
+            .all()
+        )
+    window_hours = PUBLISH_RATE_WINDOW.total_seconds() / 3600
+    return {feed_id: count / window_hours for feed_id, count in entry_counts}
+
+
+def get_crawl_interval(publish_rate: float) -> timedelta:
+    """
+    Crawl busy feeds often so their content arrives fresh and dormant feeds rarely so they aren't fetched for nothing.
+    """
+    if publish_rate <= 0:
+        return MAX_CRAWL_INTERVAL
+    interval = timedelta(hours=TARGET_NEW_ENTRIES_PER_CRAWL / publish_rate)
+    return min(max(interval, MIN_CRAWL_INTERVAL), MAX_CRAWL_INTERVAL)
+
+
+def get_next_crawl_time(rss_feed: RssFeed, publish_rate: float) -> datetime:
+    """
+    Regular next crawl time of a feed based on its last successful crawl and publish rate.
+    """
+    if rss_feed.last_crawl_time is None:
+        return datetime.min
+    return rss_feed.last_crawl_time + get_crawl_interval(publish_rate)
+
+
+def get_next_due_time(rss_feed: RssFeed, publish_rate: float) -> datetime:
+    # A failed feed waits for its backoff instead of its regular interval
+    if rss_feed.next_attempt_at is not None:
+        return rss_feed.next_attempt_at
+    return get_next_crawl_time(rss_feed, publish_rate)
+
+
+def release_crawled_feeds(lease_owner: str, feed_ids: list[int]):
+    """
+    Record the next regular crawl time of the crawled feeds and give up their leases.
+    """
+    if not feed_ids:
+        return
+    publish_rates = get_publish_rates(feed_ids)
+    with SqlSessionLocal() as sql_session:
+        rss_feeds = sql_session.query(RssFeed).filter(RssFeed.id.in_(feed_ids)).all()
+    release_feed_leases(
+        lease_owner,
+        feed_ids,
+        [
+            {
+                "id": rss_feed.id,
+                "next_crawl_at": get_next_crawl_time(rss_feed, publish_rates.get(rss_feed.id, 0)),
+            }
+            for rss_feed in rss_feeds
+        ],
+    )
+
+
+class FeedCrawlScheduler:
+    """
+    Priority queue of subscribed feeds ordered by their next due time.
+    Outdated heap items are skipped lazily when popped.
+    """
+
+    def __init__(self):
+        self.__due_heap: list[(datetime, int)] = []
+        self.__due_time_by_feed_id: dict[int, datetime] = {}
+        self.__last_refresh_time = None
+
+    def refresh_if_needed(self):
+        now = datetime.now()
+        if (
+            self.__last_refresh_time is not None
+            and now - self.__last_refresh_time < SCHEDULE_REFRESH_INTERVAL
+        ):
+            return
+        subscribed_feed_ids = get_subscribed_feed_ids()
+        self.__due_heap = []
+        self.__due_time_by_feed_id = {}
+        self.schedule(subscribed_feed_ids)
+        self.__last_refresh_time = now
+        logger.info(f"Scheduled {len(self.__due_time_by_feed_id)} subscribed feeds.")
+
+    def schedule(self, feed_ids: list[int], not_before: datetime | None = None):
+        """
+        (Re)compute the next due time of the feeds from their crawl status and publish rate.
+        A feed leased by a crawl worker or the daily crawl isn't due before its lease expires.
+        """
+        if not feed_ids:
+            return
+        publish_rates = get_publish_rates(feed_ids)
+        with SqlSessionLocal() as sql_session:
+            rss_feeds = sql_session.query(RssFeed).filter(RssFeed.id.in_(feed_ids)).all()
+        for rss_feed in rss_feeds:
+            due_time = get_next_due_time(rss_feed, publish_rates.get(rss_feed.id, 0))
+            if rss_feed.lease_expires_at is not None:
+                due_time = max(due_time, rss_feed.lease_expires_at)
+            if not_before is not None:
+                due_time = max(due_time, not_before)
+            self.__due_time_by_feed_id[rss_feed.id] = due_time
+            heapq.heappush(self.__due_heap, (due_time, rss_feed.id))
+
+    def pop_due_feed_ids(self, now: datetime, max_count: int) -> list[int]:
+        due_feed_ids = []
+        while self.__due_heap and len(due_feed_ids) < max_count:
+            due_time, feed_id = self.__due_heap[0]
+            if due_time > now:
+                break
+            heapq.heappop(self.__due_heap)
+            if self.__due_time_by_feed_id.get(feed_id) != due_time:
+                # outdated item
+                continue
+            del self.__due_time_by_feed_id[feed_id]
+            due_feed_ids.append(feed_id)
+        return due_feed_ids
+
+
+async def run_scheduler():
+    """
+    Continuously crawl feeds when they are due instead of crawling every feed once a day.
+    Due feeds are leased like crawl workers do, so those currently crawled by a worker are skipped.
+    """
+    lease_owner = get_lease_owner()
+    scheduler = FeedCrawlScheduler()
+    while True:
+        scheduler.refresh_if_needed()
+        due_feed_ids = scheduler.pop_due_feed_ids(datetime.now(), MAX_FEEDS_PER_TICK)
+        if due_feed_ids:
+            # Other crawlers may have crawled or leased the feeds since they were scheduled
+            scheduler.schedule(due_feed_ids)
+            due_feed_ids = scheduler.pop_due_feed_ids(datetime.now(), MAX_FEEDS_PER_TICK)
+        if not due_feed_ids:
+            await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+            continue
+        rss_feeds = claim_feeds(
+            lease_owner,
+            [RssFeed.id.in_(due_feed_ids)],
+            MAX_FEEDS_PER_TICK,
+            SCHEDULER_LEASE_DURATION,
+        )
+        claimed_feed_ids = [rss_feed.id for rss_feed in rss_feeds]
+        unclaimed_feed_ids = list(set(due_feed_ids) - set(claimed_feed_ids))
+        if unclaimed_feed_ids:
+            # Leased by someone else in the meantime. Look at them again after a tick at the earliest.
+            scheduler.schedule(
+                unclaimed_feed_ids, not_before=datetime.now() + timedelta(seconds=SCHEDULER_TICK_SECONDS)
+            )
+        if not rss_feeds:
+            continue
+        logger.info(f"Crawling {len(rss_feeds)} of {len(due_feed_ids)} due feeds not leased by others.")
+        try:
+            await crawl_rss_feeds(rss_feeds)
+        finally:
+            release_crawled_feeds(lease_owner, claimed_feed_ids)
+        scheduler.schedule(claimed_feed_ids)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_scheduler())
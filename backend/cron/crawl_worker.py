@@ -0,0 +1,92 @@
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.models import RssFeed
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+import asyncio
+from cron.crawl_news import get_subscribed_feed_ids, crawl_rss_feeds
+from cron.crawl_scheduler import (
+    release_crawled_feeds,
+    SCHEDULER_TICK_SECONDS,
+    SCHEDULE_REFRESH_INTERVAL,
+)
+from cron.feed_lease import get_lease_owner, claim_feeds, renew_feed_leases
+from utils.logger import setup_logger, logger
+
+setup_logger("crawl_worker")
+
+# Number of feeds a worker claims at a time
+FEED_LEASE_BATCH_SIZE = 100
+# A crashed worker's feeds become claimable once its lease expires
+FEED_LEASE_DURATION = timedelta(minutes=15)
+# Leases are renewed while the batch is in the pipeline, since extracting and embedding can outlast a lease
+FEED_LEASE_RENEW_INTERVAL = FEED_LEASE_DURATION / 3
+
+
+def claim_due_feeds(worker_id: str, feed_ids: list[int], max_count: int) -> list[RssFeed]:
+    """
+    Lease up to max_count due feeds to the worker.
+    """
+    if not feed_ids:
+        return []
+    # A failed feed waits for its backoff, others for their regular crawl time. Never scheduled feeds are due now.
+    due_time = func.coalesce(RssFeed.next_attempt_at, RssFeed.next_crawl_at)
+    return claim_feeds(
+        worker_id,
+        [RssFeed.id.in_(feed_ids), or_(due_time == None, due_time <= datetime.now())],
+        max_count,
+        FEED_LEASE_DURATION,
+        order_by=[due_time.asc().nulls_first()],
+    )
+
+
+async def __renew_leases_while_crawling(worker_id: str, feed_ids: list[int]):
+    while True:
+        await asyncio.sleep(FEED_LEASE_RENEW_INTERVAL.total_seconds())
+        try:
+            renew_feed_leases(worker_id, feed_ids, FEED_LEASE_DURATION)
+        except Exception as e:
+            logger.error(f"Failed to renew leases of {len(feed_ids)} feeds: {e}")
+
+
+async def run_worker():
+    """
+    Crawl due feeds in a loop. Any number of workers can run against the same database,
+    each claiming a disjoint batch of feeds through a lease.
+    """
+    worker_id = get_lease_owner()
+    logger.info(f"Crawl worker {worker_id} started.")
+    subscribed_feed_ids = []
+    last_refresh_time = None
+    while True:
+        now = datetime.now()
+        if last_refresh_time is None or now - last_refresh_time >= SCHEDULE_REFRESH_INTERVAL:
+            subscribed_feed_ids = get_subscribed_feed_ids()
+            last_refresh_time = now
+        rss_feeds = claim_due_feeds(worker_id, subscribed_feed_ids, FEED_LEASE_BATCH_SIZE)
+        if not rss_feeds:
+            await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+            continue
+        logger.info(f"Crawl worker {worker_id} claimed {len(rss_feeds)} feeds.")
+        feed_ids = [rss_feed.id for rss_feed in rss_feeds]
+        renew_task = asyncio.create_task(__renew_leases_while_crawling(worker_id, feed_ids))
+        try:
+            await crawl_rss_feeds(rss_feeds)
+        finally:
+            renew_task.cancel()
+            release_crawled_feeds(worker_id, feed_ids)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
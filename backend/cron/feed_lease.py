@@ -0,0 +1,88 @@
+import sys
+import os
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.db import SqlSessionLocal
+from db.models import RssFeed
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_
+import socket
+
+
+def get_lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_feeds(
+    lease_owner: str,
+    filters: list,
+    max_count: int,
+    lease_duration: timedelta,
+    order_by: list | None = None,
+) -> list[RssFeed]:
+    """
+    Lease up to max_count feeds matching the filters which no one else holds a live lease on.
+    Rows locked by a concurrent claim are skipped so that crawlers never block on or double-claim a feed.
+    Every process crawling feeds must claim them through here, otherwise it races with the crawl workers.
+    """
+    now = datetime.now()
+    claimable_feed_ids = (
+        select(RssFeed.id)
+        .where(
+            *filters,
+            or_(RssFeed.lease_expires_at == None, RssFeed.lease_expires_at < now),
+        )
+        .order_by(*(order_by or []))
+        .limit(max_count)
+        .with_for_update(skip_locked=True)
+    )
+    with SqlSessionLocal() as sql_session:
+        claimed_feed_ids = sql_session.scalars(
+            update(RssFeed)
+            .where(RssFeed.id.in_(claimable_feed_ids.scalar_subquery()))
+            .values(lease_owner=lease_owner, lease_expires_at=now + lease_duration)
+            .returning(RssFeed.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        sql_session.commit()
+        if not claimed_feed_ids:
+            return []
+        return sql_session.query(RssFeed).filter(RssFeed.id.in_(claimed_feed_ids)).all()
+
+
+def renew_feed_leases(lease_owner: str, feed_ids: list[int], lease_duration: timedelta):
+    """
+    Extend the leases the owner still holds on the feeds to lease_duration from now.
+    """
+    if not feed_ids:
+        return
+    with SqlSessionLocal() as sql_session:
+        sql_session.execute(
+            update(RssFeed)
+            .where(RssFeed.id.in_(feed_ids), RssFeed.lease_owner == lease_owner)
+            .values(lease_expires_at=datetime.now() + lease_duration)
+            .execution_options(synchronize_session=False)
+        )
+        sql_session.commit()
+
+
+def release_feed_leases(lease_owner: str, feed_ids: list[int], feed_values: list[dict] | None = None):
+    """
+    Give up the leases of the feeds, optionally updating them with feed_values rows keyed by id in the same
+    transaction. Leases which already expired and were claimed by someone else are left alone.
+    """
+    if not feed_ids:
+        return
+    with SqlSessionLocal() as sql_session:
+        if feed_values:
+            sql_session.execute(update(RssFeed), feed_values)
+        sql_session.execute(
+            update(RssFeed)
+            .where(RssFeed.id.in_(feed_ids), RssFeed.lease_owner == lease_owner)
+            .values(lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        sql_session.commit()
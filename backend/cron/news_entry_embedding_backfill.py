@@ -11,26 +11,124 @@ load_dotenv(
 # Add the parent directory to sys.path so that we can import modules correctly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from cron.common import generate_embedding
+from cron.common import (
+    embed_texts,
+    embedding_input_stats,
+    get_embedding_input,
+    pack_embedding_batches,
+    save_news_entry_embeddings,
+)
+from concurrent.futures import ThreadPoolExecutor
 from db.db import get_sql_db
 from db.models import  NewsEntry
+from llm.embedding_cache import embedding_cache_stats
+from utils.logger import logger
+from sqlalchemy import update
+from sqlalchemy.orm import aliased
 import time
+import traceback
 
 BATCH_SIZE = 1000
-MINI_BATCH_SIZE = 100
+# Embedding requests in flight. The client's rate limiter keeps them within the quota
+EMBEDDING_WORKER_NUM = 8
     
+def copy_canonical_embedding(sql_client):
+    """
+    Duplicate entries reuse the embeddings of their canonical entry instead of being embedded again.
+    """
+    canonical_entry = aliased(NewsEntry)
+    sql_client.execute(
+        update(NewsEntry)
+        .where(
+            NewsEntry.duplicate_of_id == canonical_entry.id,
+            NewsEntry.summary_clustering_embedding.is_(None),
+            canonical_entry.summary_clustering_embedding.is_not(None),
+        )
+        .values(
+            summary_clustering_embedding=canonical_entry.summary_clustering_embedding,
+            summary_document_retrieval_embedding=canonical_entry.summary_document_retrieval_embedding,
+            summary_document_retrieval_embedding_half=canonical_entry.summary_document_retrieval_embedding_half,
+            summary_document_retrieval_embedding_binary=canonical_entry.summary_document_retrieval_embedding_binary,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    sql_client.commit()
+
+def __get_news_entries_to_backfill(sql_client, after_id: int):
+    """
+    Next page of canonical news entries without embeddings, only the columns needed to embed them.
+    Pages by id so that every page is an index range scan and entries of batches failing to embed aren't fetched
+    again within the run. They are left for the next run.
+    """
+    return (
+        sql_client.query(NewsEntry.id, NewsEntry.title, NewsEntry.description, NewsEntry.content)
+        .filter(
+            NewsEntry.id > after_id,
+            NewsEntry.summary_clustering_embedding.is_(None),
+            NewsEntry.duplicate_of_id.is_(None),
+        )
+        .order_by(NewsEntry.id)
+        .limit(BATCH_SIZE)
+        .all()
+    )
+
+def __embed_texts_and_catch_error(embedding_inputs: list[str]) -> tuple[list, list] | None:
+    try:
+        return embed_texts(embedding_inputs)
+    except Exception as e:
+        logger.error(f"Error embedding a batch of {len(embedding_inputs)} news entries: {e}")
+        logger.error(f"Stack trace: {traceback.format_exc()}")
+        return None
+
 # Defining main function
 def backfill_embedding():
+    """
+    Embed canonical news entries missing embeddings with concurrent requests paced by the client's rate limiter.
+    A failing batch is logged and skipped so that it doesn't abort the whole backfill.
+    """
     sql_client = get_sql_db()
-    news_entries_to_backfill = sql_client.query(NewsEntry).filter(
-        NewsEntry.summary_clustering_embedding.is_(None)).limit(BATCH_SIZE).all()
-    while len(news_entries_to_backfill) > 0:
-        generate_embedding(news_entries_to_backfill)
-        sql_client.commit()
-        # avoid exceeding gemini rate limit        
-        time.sleep(60)
-        news_entries_to_backfill = sql_client.query(NewsEntry).filter(
-            NewsEntry.summary_clustering_embedding.is_(None)).limit(BATCH_SIZE).all()
+    start_time = time.monotonic()
+    embedded_count = 0
+    failed_count = 0
+    with ThreadPoolExecutor(max_workers=EMBEDDING_WORKER_NUM) as executor:
+        news_entries_to_backfill = __get_news_entries_to_backfill(sql_client, 0)
+        while len(news_entries_to_backfill) > 0:
+            batches = pack_embedding_batches(
+                news_entries_to_backfill,
+                [get_embedding_input(news_entry) for news_entry in news_entries_to_backfill],
+            )
+            for (batch_news_entries, _), embeddings in zip(
+                batches,
+                executor.map(
+                    __embed_texts_and_catch_error, [embedding_inputs for _, embedding_inputs in batches]
+                ),
+            ):
+                if embeddings is None:
+                    failed_count += len(batch_news_entries)
+                    continue
+                clustering_embedding, document_retrieval_embedding = embeddings
+                save_news_entry_embeddings(
+                    sql_client,
+                    [news_entry.id for news_entry in batch_news_entries],
+                    clustering_embedding,
+                    document_retrieval_embedding,
+                )
+                embedded_count += len(batch_news_entries)
+            sql_client.commit()
+            elapsed_seconds = time.monotonic() - start_time
+            # Each entry gets a clustering and a document retrieval embedding
+            logger.info(
+                f"Backfilled {embedded_count} news entries ({failed_count} failed) in {elapsed_seconds:.0f}s, "
+                f"{embedded_count * 2 / elapsed_seconds:.1f} embeddings/s in {len(batches)} requests. "
+                f"{embedding_cache_stats.describe()}. {embedding_input_stats.describe()}."
+            )
+            news_entries_to_backfill = __get_news_entries_to_backfill(
+                sql_client, news_entries_to_backfill[-1].id
+            )
+    copy_canonical_embedding(sql_client)
+    logger.info(
+        f"Backfill finished. {embedding_cache_stats.describe()}. {embedding_input_stats.describe()}."
+    )
         
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+"""
+Fill the halfvec and binary shadows of existing document retrieval embeddings.
+New embeddings get them when they are written, so this only needs to run once after the migration.
+
+Usage: python backend/cron/quantized_embedding_backfill.py
+"""
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.db import SqlSessionLocal
+from db.models import NewsEntry
+from pgvector.sqlalchemy import HALFVEC
+from sqlalchemy import cast, func, update
+from utils.logger import setup_logger, logger
+import time
+
+setup_logger("quantized_embedding_backfill")
+
+# Rows updated per transaction. Small enough to keep locks and WAL bursts short.
+BATCH_SIZE = 5000
+
+
+def backfill_quantized_embedding():
+    start_time = time.monotonic()
+    updated_count = 0
+    after_id = 0
+    while True:
+        with SqlSessionLocal() as sql_session:
+            news_entry_ids = [
+                news_entry_id
+                for (news_entry_id,) in sql_session.query(NewsEntry.id)
+                .filter(
+                    NewsEntry.id > after_id,
+                    NewsEntry.summary_document_retrieval_embedding.is_not(None),
+                    NewsEntry.summary_document_retrieval_embedding_half.is_(None),
+                )
+                .order_by(NewsEntry.id)
+                .limit(BATCH_SIZE)
+            ]
+            if not news_entry_ids:
+                break
+            sql_session.execute(
+                update(NewsEntry)
+                .where(NewsEntry.id.in_(news_entry_ids))
+                .values(
+                    summary_document_retrieval_embedding_half=cast(
+                        NewsEntry.summary_document_retrieval_embedding, HALFVEC(768)
+                    ),
+                    summary_document_retrieval_embedding_binary=func.binary_quantize(
+                        NewsEntry.summary_document_retrieval_embedding
+                    ),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            sql_session.commit()
+        updated_count += len(news_entry_ids)
+        after_id = news_entry_ids[-1]
+        logger.info(f"Quantized embeddings of {updated_count} news entries.")
+    logger.info(
+        f"Quantized embeddings of {updated_count} news entries in {time.monotonic() - start_time:.1f} seconds."
+    )
+
+
+if __name__ == "__main__":
+    backfill_quantized_embedding()
@@ -0,0 +1,126 @@
+"""
+Rebuild news entries from archived feed bodies without fetching anything.
+
+Usage: python backend/cron/reparse_feeds.py [--feed-id 1 --feed-id 2] [--since 2025-01-01] [--until 2025-02-01]
+       [--update-existing]
+"""
+from dotenv import load_dotenv, find_dotenv
+import sys
+import os
+
+# Load environment variables from .env
+load_dotenv(
+    find_dotenv(filename=".env.local"), override=True
+)  # Load local environment variables if available
+
+
+# Add the parent directory to sys.path so that we can import modules correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from db.db import SqlSessionLocal
+from db.models import RssFeed
+from cron.common import bulk_insert_news_entries, load_near_duplicate_index
+from cron.crawl_news import NEWS_ENTRY_INGEST_BATCH_SIZE, parse_doc
+from utils.feed_archive import ArchivedFetch, get_archived_feed_ids, list_archived_fetches, read_feed_body
+from utils.logger import setup_logger, logger
+import argparse
+import time
+import traceback
+
+setup_logger("reparse_feeds")
+
+# Archived fetches handed to a worker process at a time
+REPARSE_CHUNK_SIZE = 16
+
+
+def _reparse_archived_fetch(archived_fetch: ArchivedFetch) -> list[dict]:
+    """
+    Runs in a worker process. Reads the body from the archive itself so that only small arguments cross processes.
+    """
+    try:
+        content = read_feed_body(archived_fetch.content_hash)
+        rss_feed = RssFeed(id=archived_fetch.feed_id, feed_url=archived_fetch.feed_url)
+        # Every archived item is wanted, not only the ones newer than the feed's last crawl
+        news_entry_rows = parse_doc(
+            content,
+            rss_feed,
+            stale_before=datetime.min.replace(tzinfo=timezone.utc),
+            crawl_time=archived_fetch.fetch_time,
+        )
+    except Exception as e:
+        logger.error(
+            f"Error reparsing feed {archived_fetch.feed_url} fetched at {archived_fetch.fetch_time}: {e}"
+        )
+        logger.error(f"Stack trace: {traceback.format_exc()}")
+        return []
+    return news_entry_rows
+
+
+def _flush(news_entry_rows: list[dict], near_duplicate_index, update_existing: bool) -> int:
+    with SqlSessionLocal() as sql_session:
+        news_entry_ids = bulk_insert_news_entries(
+            sql_session, news_entry_rows, near_duplicate_index, update_existing
+        )
+        sql_session.commit()
+    return len(news_entry_ids)
+
+
+def reparse_feeds(
+    feed_ids: list[int] | None,
+    since: datetime | None,
+    until: datetime | None,
+    update_existing: bool,
+):
+    """
+    Parse archived bodies in parallel across cores and persist the entries in batches from this process.
+    Fetches are processed from oldest to newest, so with update_existing the latest version of an entry wins.
+    """
+    start_time = time.monotonic()
+    archived_fetches = [
+        archived_fetch
+        for feed_id in (feed_ids or get_archived_feed_ids())
+        for archived_fetch in list_archived_fetches(feed_id, since, until)
+    ]
+    archived_fetches.sort(key=lambda archived_fetch: archived_fetch.fetch_time)
+    logger.info(f"Reparsing {len(archived_fetches)} archived fetches.")
+    with SqlSessionLocal() as sql_session:
+        near_duplicate_index = load_near_duplicate_index(sql_session)
+    parsed_entry_count = 0
+    saved_entry_count = 0
+    news_entry_rows = []
+    with ProcessPoolExecutor() as executor:
+        for rows in executor.map(
+            _reparse_archived_fetch, archived_fetches, chunksize=REPARSE_CHUNK_SIZE
+        ):
+            parsed_entry_count += len(rows)
+            news_entry_rows.extend(rows)
+            if len(news_entry_rows) >= NEWS_ENTRY_INGEST_BATCH_SIZE:
+                saved_entry_count += _flush(news_entry_rows, near_duplicate_index, update_existing)
+                news_entry_rows = []
+    if news_entry_rows:
+        saved_entry_count += _flush(news_entry_rows, near_duplicate_index, update_existing)
+    logger.info(
+        f"Reparsed {parsed_entry_count} news entries from {len(archived_fetches)} archived fetches. "
+        f"{'inserted or updated' if update_existing else 'inserted'} {saved_entry_count}. "
+        f"took {time.monotonic() - start_time:.1f} seconds."
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Rebuild news entries from archived feed bodies")
+    arg_parser.add_argument("--feed-id", type=int, action="append", dest="feed_ids")
+    arg_parser.add_argument("--since", type=datetime.fromisoformat)
+    arg_parser.add_argument("--until", type=datetime.fromisoformat)
+    arg_parser.add_argument(
+        "--update-existing",
+        action="store_true",
+        help="overwrite parsed columns of entries which already exist",
+    )
+    args = arg_parser.parse_args()
+    reparse_feeds(args.feed_ids, args.since, args.until, args.update_existing)
+
+
+if __name__ == "__main__":
+    main()
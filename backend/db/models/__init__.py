@@ -4,6 +4,7 @@ from .common import User, ConversationHistory, UserStatus, UserTier, Conversatio
 from .newssummary import RssFeed, NewsEntry, NewsSummaryEntry,  NewsPreferenceVersion, NewsPreferenceChangeCause, NewsSummaryExperimentStats
 from .common_enums import NewsSummaryPeriod
 from .experiment import NewsChunkingExperiment, NewsPreferenceApplicationExperiment
+from .embedding import EmbeddingCacheEntry
 __all__ = [
     'Base',
     'ApiLatencyLog',
@@ -22,4 +23,5 @@ __all__ = [
     'LlmUsageLog',
     'NewsSummaryPeriod',
     'ConversationType',
+    'EmbeddingCacheEntry',
 ]
\ No newline at end of file
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from pgvector.sqlalchemy import Vector
+from .base import Base
+
+
+# Embeddings by the hash of the embedded text, so that identical text is never sent to the embedding API twice
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    model = Column(String, primary_key=True)
+    task_type = Column(String, primary_key=True)
+    dimension = Column(Integer, primary_key=True)
+    # blake2b hex digest of the whitespace normalized text
+    text_hash = Column(String, primary_key=True)
+    embedding = Column(Vector())
+    # Entries older than the retention are pruned
+    created_at = Column(DateTime, server_default=func.now(), index=True)
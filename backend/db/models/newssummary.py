@@ -1,10 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Boolean, Date, Index, func
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, Boolean, Date, Index, func
 from datetime import datetime
 import enum
 from .base import Base
 from sqlalchemy.dialects.postgresql import  ARRAY
 from .experiment import NewsChunkingExperiment, NewsPreferenceApplicationExperiment
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
 from .common_enums import NewsSummaryPeriod
 
 class RssFeed(Base):
@@ -15,6 +15,22 @@ class RssFeed(Base):
     last_crawl_time = Column(DateTime, default=datetime(1970, 1, 1))
     title = Column(String)
     html_url = Column(String)
+    # Validators from last crawl response for conditional GET
+    etag = Column(String)
+    last_modified = Column(String)
+    # Number of successful fetches and how many of them are 304 not modified
+    fetch_count = Column(Integer, default=0)
+    not_modified_count = Column(Integer, default=0)
+    # Error of the last failed crawl. Cleared once a crawl succeeds.
+    last_error = Column(String)
+    consecutive_failure_count = Column(Integer, default=0)
+    # Failed feeds are not crawled again until this time. Null if last crawl succeeded.
+    next_attempt_at = Column(DateTime)
+    # Regular next crawl time learned from the feed's publish rate
+    next_crawl_at = Column(DateTime)
+    # Crawl worker holding the feed and when its lease expires. Expired leases can be claimed by other workers.
+    lease_owner = Column(String)
+    lease_expires_at = Column(DateTime)
 
 
 class NewsEntry(Base):
@@ -22,16 +38,50 @@ class NewsEntry(Base):
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     rss_feed_id = Column(Integer)
-    entry_rss_guid = Column(String)
+    entry_rss_guid = Column(String, unique=True, index=True)
     # might be empty
     entry_url = Column(String)
     crawl_time = Column(DateTime, server_default=func.now())
     title = Column(String)
     description = Column(String)
     content = Column(String)
+    # Original description and content if they held HTML. description and content are normalized to plain text.
+    raw_description = Column(String)
+    raw_content = Column(String)
     pub_time = Column(DateTime)
+    # Fingerprints to detect the same story crawled from different feeds
+    canonical_url = Column(String, index=True)
+    content_hash = Column(String, index=True)
+    minhash = Column(ARRAY(BigInteger))
+    # Canonical entry of the story if this entry is a duplicate of it. Null for canonical entries.
+    duplicate_of_id = Column(Integer, index=True)
+    # Main text of the article at entry_url extracted at crawl time. Null if not extracted or extraction failed.
+    article_text = Column(String)
     summary_clustering_embedding = Column(Vector(768))  # embedding of the content for clustering
     summary_document_retrieval_embedding = Column(Vector(768))  # embedding of the content for RAG
+    # Compact shadows of summary_document_retrieval_embedding for the coarse pass of retrieval,
+    # written together with it. Results are reranked with the full precision embedding.
+    summary_document_retrieval_embedding_half = Column(HALFVEC(768))
+    # 1 bit per dimension, set where the embedding is positive
+    summary_document_retrieval_embedding_binary = Column(BIT(768))
+
+    __table_args__ = (
+        # Approximate nearest neighbor indexes for retrieval by cosine distance
+        Index(
+            "ix_news_entries_summary_document_retrieval_embedding_hnsw",
+            "summary_document_retrieval_embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"summary_document_retrieval_embedding": "vector_cosine_ops"},
+        ),
+        Index(
+            "ix_news_entries_summary_document_retrieval_embedding_half_hnsw",
+            "summary_document_retrieval_embedding_half",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"summary_document_retrieval_embedding_half": "halfvec_cosine_ops"},
+        ),
+    )
 
 class NewsSummaryEntry(Base):
     __tablename__ = "news_summary_entry"
@@ -1,8 +1,14 @@
 from db.models.common import ConversationHistory, MessageType
+from db.models import NewsEntry
+from db.db import SqlSessionLocal
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
 from llm.client_proxy import LlmMessage, LlmMessageType
 from llm.tracker import LlmTracker
 from llm.client_proxy_factory import get_default_client_proxy
 from utils.http import ua
+from utils.article_extractor import extract_article_text
+import asyncio
 import requests
 from utils.logger import logger
 
@@ -27,16 +33,54 @@ __web_search_prompt = """
         {url}
     """
 
+def __get_stored_article_texts(url_list: list[str]) -> dict[str, str]:
+    """
+    Article texts extracted at crawl time. Duplicate entries use the text of their canonical entry.
+    Runs in a worker thread so it uses its own session.
+    """
+    canonical_entry = aliased(NewsEntry)
+    with SqlSessionLocal() as sql_session:
+        return dict(
+            sql_session
+            .query(NewsEntry.entry_url, canonical_entry.article_text)
+            .join(
+                canonical_entry,
+                canonical_entry.id == func.coalesce(NewsEntry.duplicate_of_id, NewsEntry.id),
+            )
+            .filter(
+                NewsEntry.entry_url.in_(url_list),
+                canonical_entry.article_text.is_not(None),
+            )
+            .all()
+        )
+
+def __fetch_article_text(url: str) -> str | None:
+    try:
+        response = requests.get(url, headers=__header, timeout=10)
+        response.raise_for_status()  # This will raise an exception for HTTP errors
+        # Send the article text rather than the whole page with its markup
+        return extract_article_text(response.text) or response.text
+    except Exception as e:
+        logger.error(f"Failed to crawl {url}: {str(e)}")
+        return None
+
 async def crawl_and_summarize_url(url_list: list[str], llm_tracker: LlmTracker) -> str:
+    # The database lookup, downloads and extraction block, so they run in threads and the urls are fetched concurrently
+    stored_article_texts = await asyncio.to_thread(__get_stored_article_texts, url_list)
+    urls_to_fetch = [url for url in url_list if url not in stored_article_texts]
+    fetched_article_texts = dict(
+        zip(
+            urls_to_fetch,
+            await asyncio.gather(
+                *[asyncio.to_thread(__fetch_article_text, url) for url in urls_to_fetch]
+            ),
+        )
+    )
     content_list = []
     for url in url_list:
-        try:
-            response = requests.get(url, headers=__header, timeout=10)
-            response.raise_for_status()  # This will raise an exception for HTTP errors
-            content_list.append(response.text)
-        except Exception as e:
-            logger.error(f"Failed to crawl {url}: {str(e)}")
-            continue
+        article_text = stored_article_texts.get(url) or fetched_article_texts.get(url)
+        if article_text:
+            content_list.append(article_text)
     # summarize the content
     if content_list:
         return (await get_default_client_proxy().generate_content_async(
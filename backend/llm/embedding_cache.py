@@ -0,0 +1,144 @@
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from db.db import SqlSessionLocal
+from db.models import EmbeddingCacheEntry
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from utils.logger import logger
+import hashlib
+import os
+import re
+
+# Cached embeddings older than this are pruned. Texts of old news are rarely embedded again.
+EMBEDDING_CACHE_RETENTION = timedelta(days=int(os.getenv("EMBEDDING_CACHE_RETENTION_DAYS", "90")))
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class EmbeddingCacheStats:
+    """
+    Hit rate of the embedding cache in this process.
+    """
+
+    def __init__(self):
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def record(self, hit_count: int, miss_count: int):
+        self.hit_count += hit_count
+        self.miss_count += miss_count
+
+    def get_hit_rate(self) -> float:
+        lookup_count = self.hit_count + self.miss_count
+        if lookup_count == 0:
+            return 0.0
+        return self.hit_count / lookup_count
+
+    def describe(self) -> str:
+        return (
+            f"embedding cache {self.hit_count} hits / {self.hit_count + self.miss_count} lookups "
+            f"({self.get_hit_rate():.0%})"
+        )
+
+
+embedding_cache_stats = EmbeddingCacheStats()
+
+
+def get_text_hash(text: str) -> str:
+    """
+    Hash of the text with whitespace normalized, so that texts differing only in spacing share an embedding.
+    """
+    normalized_text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+    return hashlib.blake2b(normalized_text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def __load_cached_embeddings(
+    model: str, task_type: str, dimension: int, text_hashes: list[str]
+) -> dict[str, list[float]]:
+    with SqlSessionLocal() as sql_session:
+        rows = (
+            sql_session.query(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding)
+            .filter(
+                EmbeddingCacheEntry.model == model,
+                EmbeddingCacheEntry.task_type == task_type,
+                EmbeddingCacheEntry.dimension == dimension,
+                EmbeddingCacheEntry.text_hash.in_(text_hashes),
+            )
+            .all()
+        )
+    return {text_hash: list(embedding) for text_hash, embedding in rows}
+
+
+def __save_embeddings(
+    model: str, task_type: str, dimension: int, embedding_by_text_hash: dict[str, list[float]]
+):
+    with SqlSessionLocal() as sql_session:
+        sql_session.execute(
+            insert(EmbeddingCacheEntry)
+            .values(
+                [
+                    {
+                        "model": model,
+                        "task_type": task_type,
+                        "dimension": dimension,
+                        "text_hash": text_hash,
+                        "embedding": embedding,
+                    }
+                    for text_hash, embedding in embedding_by_text_hash.items()
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+        sql_session.commit()
+
+
+def embed_with_cache(
+    model: str,
+    task_type: str,
+    dimension: int,
+    contents: list[str],
+    embed: Callable[[list[str]], list[list[float]]],
+) -> list[list[float]]:
+    """
+    Embed the contents, only calling embed for texts whose embedding isn't cached yet.
+    Repeated texts within the contents are embedded once. If the cache is unreachable everything is embedded.
+    """
+    text_hashes = [get_text_hash(content) for content in contents]
+    unique_text_hashes = list(dict.fromkeys(text_hashes))
+    try:
+        embedding_by_text_hash = __load_cached_embeddings(
+            model, task_type, dimension, unique_text_hashes
+        )
+    except Exception as e:
+        logger.error(f"Error reading the embedding cache: {e}")
+        embedding_by_text_hash = {}
+    content_by_text_hash = dict(zip(text_hashes, contents))
+    missing_text_hashes = [
+        text_hash for text_hash in unique_text_hashes if text_hash not in embedding_by_text_hash
+    ]
+    embedding_cache_stats.record(
+        len(contents) - len(missing_text_hashes), len(missing_text_hashes)
+    )
+    if missing_text_hashes:
+        new_embeddings = embed(
+            [content_by_text_hash[text_hash] for text_hash in missing_text_hashes]
+        )
+        new_embedding_by_text_hash = dict(zip(missing_text_hashes, new_embeddings))
+        try:
+            __save_embeddings(model, task_type, dimension, new_embedding_by_text_hash)
+        except Exception as e:
+            logger.error(f"Error writing the embedding cache: {e}")
+        embedding_by_text_hash.update(new_embedding_by_text_hash)
+    return [embedding_by_text_hash[text_hash] for text_hash in text_hashes]
+
+
+def prune_embedding_cache(retention: timedelta = EMBEDDING_CACHE_RETENTION) -> int:
+    """
+    Delete cached embeddings created before the retention. Returns the number of deleted entries.
+    """
+    with SqlSessionLocal() as sql_session:
+        deleted_count = sql_session.execute(
+            delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.created_at < datetime.now() - retention)
+        ).rowcount
+        sql_session.commit()
+    return deleted_count
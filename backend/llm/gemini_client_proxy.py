@@ -7,12 +7,28 @@ from typing import Any
 from .tracker import LlmTracker
 from utils.logger import logger
 from .model_utils import flatten_schema_and_remove_defs
+from .embedding_cache import embed_with_cache
+from google.genai import errors
+from utils.rate_limiter import RateLimiter
+from utils.text import estimate_token_count
+import re
+
+# Embedding quota of the gemini project
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "100"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+MAX_EMBEDDING_RATE_LIMIT_RETRIES = 5
+# Wait after a 429 which doesn't say when to retry
+DEFAULT_RATE_LIMIT_RETRY_SECONDS = 30
+_RETRY_DELAY_PATTERN = re.compile(r"'retryDelay': '(\d+(?:\.\d+)?)s'")
+
 class GeminiClientProxy(LlmClientProxy):
     __generation_model = "gemini-2.0-flash"
     __embedding_model = "gemini-embedding-001"
+    __embedding_dimension = 768
 
     def __init__(self):
         self.__client = Client(api_key=os.getenv("GEMINI_API_KEY", ""))
+        self.__embedding_rate_limiter = RateLimiter(EMBEDDING_REQUESTS_PER_MINUTE, EMBEDDING_TOKENS_PER_MINUTE)
 
     def generate_content(self, 
         prompt: str | list[LlmMessage], 
@@ -189,9 +205,48 @@ class GeminiClientProxy(LlmClientProxy):
         return contents
 
     def embed_content(self, contents: list[str], task_type: EmbeddingTaskType) -> list[list[float]]:
-        response = self.__client.models.embed_content(model=self.__embedding_model, contents=contents,
-                config=types.EmbedContentConfig(task_type=self.__get_embedding_task_type(task_type), output_dimensionality=768))
-        return [ embd.values for embd in response.embeddings]
+        gemini_task_type = self.__get_embedding_task_type(task_type)
+        return embed_with_cache(
+            self.__embedding_model,
+            gemini_task_type,
+            self.__embedding_dimension,
+            contents,
+            lambda uncached_contents: self.__embed_content(uncached_contents, gemini_task_type),
+        )
+
+    def __embed_content(self, contents: list[str], gemini_task_type: str) -> list[list[float]]:
+        """
+        Embed within the project quota. Safe to call from several threads, they share the rate limiter.
+        On 429 every caller pauses until the time the API asks for and the request is retried.
+        """
+        token_count = sum(estimate_token_count(content) for content in contents)
+        retry_count = 0
+        while True:
+            self.__embedding_rate_limiter.acquire(token_count)
+            try:
+                response = self.__client.models.embed_content(model=self.__embedding_model, contents=contents,
+                        config=types.EmbedContentConfig(task_type=gemini_task_type, output_dimensionality=self.__embedding_dimension))
+                return [ embd.values for embd in response.embeddings]
+            except errors.ClientError as e:
+                if e.code != 429 or retry_count >= MAX_EMBEDDING_RATE_LIMIT_RETRIES:
+                    raise e
+                retry_count += 1
+                retry_after_seconds = self.__get_retry_after_seconds(e)
+                logger.warning(f"Embedding rate limited, retry {retry_count} in {retry_after_seconds}s")
+                self.__embedding_rate_limiter.back_off(retry_after_seconds)
+
+    def __get_retry_after_seconds(self, error: errors.ClientError) -> float:
+        """
+        Retry time from the Retry-After header, or from the RetryInfo detail gemini puts in the error body.
+        """
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("Retry-After", "") if response is not None and hasattr(response, "headers") else ""
+        if retry_after.isdigit():
+            return float(retry_after)
+        match = _RETRY_DELAY_PATTERN.search(str(error.details))
+        if match:
+            return float(match.group(1))
+        return DEFAULT_RATE_LIMIT_RETRY_SECONDS
     
     def __get_embedding_task_type(self, task_type: EmbeddingTaskType) -> str:
         """
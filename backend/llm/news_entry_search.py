@@ -0,0 +1,176 @@
+from db.models import NewsEntry
+from enum import Enum
+from pgvector.sqlalchemy import Vector, HALFVEC
+from sqlalchemy import Integer, Row, cast, column, func, select, true, values
+from sqlalchemy.orm import Bundle, Session
+import os
+
+
+class FilterStrategy(Enum):
+    """
+    How filtered searches get enough rows out of an HNSW index, which on its own returns only the ef_search nearest
+    rows before filtering.
+    """
+
+    ITERATIVE_SCAN = "iterative_scan"  # pgvector 0.8 keeps scanning the index until enough rows pass the filters
+    OVER_FETCH = "over_fetch"  # take OVER_FETCH_FACTOR times more rows from the index, then filter
+
+
+class CoarseSearchMode(Enum):
+    """
+    Embedding the nearest news entries are first searched on. Compact forms are reranked with full precision.
+    """
+
+    FULL = "full"  # search on the full precision embedding, no rerank
+    HALFVEC = "halfvec"  # cosine distance on the half precision shadow
+    BINARY = "binary"  # hamming distance on the binary quantized shadow
+
+
+# Full until cron/quantized_embedding_backfill.py has filled the shadows of existing entries
+RETRIEVAL_COARSE_SEARCH_MODE = CoarseSearchMode(os.getenv("RETRIEVAL_COARSE_SEARCH_MODE", "full"))
+# Candidates of the coarse pass reranked per result. Binary quantization loses more order so it needs more.
+RERANK_CANDIDATE_FACTOR = {
+    CoarseSearchMode.FULL: 1,
+    CoarseSearchMode.HALFVEC: 2,
+    CoarseSearchMode.BINARY: 10,
+}
+# Size of the HNSW candidate list. Higher finds more of the true nearest rows at the cost of latency.
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "100"))
+# pgvector's upper bound of hnsw.ef_search
+MAX_HNSW_EF_SEARCH = 1000
+HNSW_FILTER_STRATEGY = FilterStrategy(os.getenv("HNSW_FILTER_STRATEGY", "iterative_scan"))
+OVER_FETCH_FACTOR = 10
+# Columns of the news entries returned by searches. The embeddings and raw texts are never loaded.
+NEWS_ENTRY_RESULT_COLUMNS = [
+    NewsEntry.id,
+    NewsEntry.title,
+    NewsEntry.description,
+    NewsEntry.content,
+    NewsEntry.entry_url,
+    NewsEntry.pub_time,
+    NewsEntry.crawl_time,
+]
+
+
+def __set_hnsw_search_options(sql_client: Session, ef_search: int, filter_strategy: FilterStrategy):
+    """
+    Set the HNSW options for the rest of the current transaction.
+    """
+    iterative_scan = "strict_order" if filter_strategy == FilterStrategy.ITERATIVE_SCAN else "off"
+    sql_client.execute(
+        select(
+            func.set_config("hnsw.ef_search", str(min(ef_search, MAX_HNSW_EF_SEARCH)), True),
+            func.set_config("hnsw.iterative_scan", iterative_scan, True),
+        )
+    )
+
+
+def __get_nearest_query(column, distance, filters: list, limit: int, filter_strategy: FilterStrategy):
+    # Every query scans news_entries on its own and is only correlated to the query embeddings
+    if filter_strategy == FilterStrategy.OVER_FETCH and filters:
+        # The inner query has no filters so that it is a plain index scan
+        nearest_ids = (
+            select(NewsEntry.id)
+            .where(column.is_not(None))
+            .order_by(distance)
+            .limit(limit * OVER_FETCH_FACTOR)
+            .correlate_except(NewsEntry)
+            .scalar_subquery()
+        )
+        return (
+            select(NewsEntry.id, distance.label("distance"))
+            .where(NewsEntry.id.in_(nearest_ids), *filters)
+            .order_by(distance)
+            .limit(limit)
+            .correlate_except(NewsEntry)
+        )
+    return (
+        select(NewsEntry.id, distance.label("distance"))
+        .where(column.is_not(None), *filters)
+        .order_by(distance)
+        .limit(limit)
+        .correlate_except(NewsEntry)
+    )
+
+
+def search_nearest_news_entries_for_queries(
+    sql_client: Session,
+    embeddings: list[list[float]],
+    filters: list,
+    limit: int,
+    mode: CoarseSearchMode = RETRIEVAL_COARSE_SEARCH_MODE,
+    ef_search: int = HNSW_EF_SEARCH,
+    filter_strategy: FilterStrategy = HNSW_FILTER_STRATEGY,
+) -> list[list[tuple[Row, float]]]:
+    """
+    For each query embedding the news entries matching the filters nearest to it by document retrieval cosine
+    distance, with their distance. Entries are rows of NEWS_ENTRY_RESULT_COLUMNS. All queries are searched by one
+    statement, a LATERAL join of the nearest entries over a VALUES list of the query embeddings.
+    The full precision and halfvec searches are approximate through their HNSW indexes.
+    """
+    if not embeddings:
+        return []
+    queries = values(
+        column("query_index", Integer),
+        column("embedding", Vector(768)),
+        name="queries",
+    ).data(list(enumerate(embeddings)))
+    query_embedding = cast(queries.c.embedding, Vector(768))
+    full_distance = NewsEntry.summary_document_retrieval_embedding.cosine_distance(query_embedding)
+    if mode == CoarseSearchMode.FULL:
+        coarse_column = NewsEntry.summary_document_retrieval_embedding
+        coarse_distance = full_distance
+    elif mode == CoarseSearchMode.HALFVEC:
+        coarse_column = NewsEntry.summary_document_retrieval_embedding_half
+        coarse_distance = coarse_column.cosine_distance(cast(query_embedding, HALFVEC(768)))
+    else:
+        coarse_column = NewsEntry.summary_document_retrieval_embedding_binary
+        coarse_distance = coarse_column.hamming_distance(func.binary_quantize(query_embedding))
+    candidate_limit = limit * RERANK_CANDIDATE_FACTOR[mode]
+    # Without iterative scans the index returns at most ef_search rows
+    index_row_limit = candidate_limit
+    if filter_strategy == FilterStrategy.OVER_FETCH and filters:
+        index_row_limit *= OVER_FETCH_FACTOR
+    __set_hnsw_search_options(sql_client, max(ef_search, index_row_limit), filter_strategy)
+    nearest = __get_nearest_query(coarse_column, coarse_distance, filters, candidate_limit, filter_strategy)
+    if mode != CoarseSearchMode.FULL:
+        # Rerank the candidates of the coarse pass by full precision distance
+        nearest = (
+            select(NewsEntry.id, full_distance.label("distance"))
+            .where(NewsEntry.id.in_(nearest.with_only_columns(NewsEntry.id).scalar_subquery()))
+            .order_by(full_distance)
+            .limit(limit)
+            .correlate_except(NewsEntry)
+        )
+    nearest = nearest.lateral("nearest")
+    rows = sql_client.execute(
+        select(queries.c.query_index, Bundle("news_entry", *NEWS_ENTRY_RESULT_COLUMNS), nearest.c.distance)
+        .select_from(queries)
+        .join(nearest, true())
+        .join(NewsEntry, NewsEntry.id == nearest.c.id)
+        .order_by(queries.c.query_index, nearest.c.distance)
+    ).all()
+    results = [[] for _ in embeddings]
+    for query_index, news_entry, distance in rows:
+        results[query_index].append((news_entry, distance))
+    return results
+
+
+def search_nearest_news_entries(
+    sql_client: Session,
+    embedding: list[float],
+    filters: list,
+    limit: int,
+    mode: CoarseSearchMode = RETRIEVAL_COARSE_SEARCH_MODE,
+    ef_search: int = HNSW_EF_SEARCH,
+    filter_strategy: FilterStrategy = HNSW_FILTER_STRATEGY,
+) -> list[Row]:
+    """
+    News entries matching the filters nearest to the embedding by document retrieval cosine distance.
+    """
+    return [
+        news_entry
+        for news_entry, _ in search_nearest_news_entries_for_queries(
+            sql_client, [embedding], filters, limit, mode, ef_search, filter_strategy
+        )[0]
+    ]
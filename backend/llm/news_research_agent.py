@@ -25,7 +25,12 @@ from db.models import (
 from enum import Enum
 from datetime import  datetime, timedelta
 from utils.logger import logger
+from db.db import SqlSessionLocal
+import asyncio
 from .agent_utils import crawl_and_summarize_url
+from .news_entry_search import search_nearest_news_entries_for_queries
+from .retrieval_context import assemble_retrieval_context
+from utils.text import estimate_token_count
 from sqlalchemy import or_, and_
 from utils.exceptions import UserErrorCode, ApiErrorType, ApiException
 
@@ -143,11 +148,6 @@ async def __expand_news_url(
     return await crawl_and_summarize_url(url_list=url_list, llm_tracker=llm_tracker)
 
 
-TEXT_SEARCH_RESPONSE_TEMPLATE = """
-    News entries for {text}:
-    {news_entries}
-"""
-
 NEWS_ENTRY_LIMIT_PER_QUERY = 100
 
 
@@ -172,58 +172,22 @@ def __search_news_entries_by_text_embedding(
     elif period == Period.LAST_HALF_YEAR:
         from_time = datetime.now() - timedelta(days=180)
 
-    response_list = []
-    for idx, query in enumerate(query_list):
-        embedding = embeddings[idx]
-        news_entry_list = (
-            sql_client.query(NewsEntry)
-            .filter(
-                NewsEntry.rss_feed_id.in_(subscribed_rss_feeds_ids),
-                NewsEntry.summary_document_retrieval_embedding.is_not(None),
-                or_(
-                    and_(NewsEntry.pub_time >= from_time),
-                    and_(
-                        NewsEntry.pub_time.is_(None),
-                        NewsEntry.crawl_time >= from_time,
-                    ),
+    search_results = search_nearest_news_entries_for_queries(
+        sql_client,
+        embeddings,
+        filters=[
+            NewsEntry.rss_feed_id.in_(subscribed_rss_feeds_ids),
+            or_(
+                and_(NewsEntry.pub_time >= from_time),
+                and_(
+                    NewsEntry.pub_time.is_(None),
+                    NewsEntry.crawl_time >= from_time,
                 ),
-            )
-            .order_by(
-                NewsEntry.summary_document_retrieval_embedding.cosine_distance(
-                    embedding
-                )
-            )
-            .limit(NEWS_ENTRY_LIMIT_PER_QUERY)
-            .all()
-        )
-        logger.info(
-            f"Search query: {query}, found {len(news_entry_list)} news entries."
-        )
-        sorted_news_entry_list = sorted(
-            news_entry_list,
-            key=lambda news_entry: (news_entry.pub_time or news_entry.crawl_time),
-            reverse=True,
-        )
-        simple_news_entries = [
-            {
-                "title": news_entry.title,
-                "content": news_entry.content or "",
-                "description": news_entry.description or "",
-                "publish_time": (news_entry.pub_time or news_entry.crawl_time)
-                .date()
-                .isoformat(),
-                "url": news_entry.entry_url or "",
-            }
-            for news_entry in sorted_news_entry_list
-        ]
-
-        response_list.append(
-            TEXT_SEARCH_RESPONSE_TEMPLATE.format(
-                text=query, news_entries=simple_news_entries
-            )
-        )
-    
-    return "\n".join(response_list)
+            ),
+        ],
+        limit=NEWS_ENTRY_LIMIT_PER_QUERY,
+    )
+    return assemble_retrieval_context(query_list, search_results)
 
 
 CHAT_HISTORY_LIMIT = 100
@@ -315,7 +279,9 @@ async def __answer_question_in_react_mode(
     tracker.start()
     logger.info("question answering react agent starts.")
     empty_response_count = 0
+    turn = 0
     while len(react_intermediate_messages) < MAX_REACT_MESSAGES:
+        turn += 1
         response_llm_messages = await llm_client.generate_content_async(
             prompt=react_intermediate_messages,
             system_prompt=system_prompt,
@@ -351,6 +317,7 @@ async def __answer_question_in_react_mode(
         ):
             react_intermediate_messages.pop()
 
+        function_call_messages = []
         for llm_message in response_llm_messages:
             if llm_message.type == LlmMessageType.AI:
                 if not llm_message.text_content:
@@ -366,29 +333,51 @@ async def __answer_question_in_react_mode(
                     return final_answer_match.group(1)
                 react_intermediate_messages.append(llm_message)
             elif llm_message.type == LlmMessageType.FUNCTION_CALL:
-                # Handle function calls here if needed
-                react_intermediate_messages.append(llm_message)
-                react_intermediate_messages.append(
-                    LlmMessage(
-                        type=LlmMessageType.FUNCTION_RESPONSE,
-                        function_response=await __call_function_for_llm(
-                            subscribed_rss_feeds_ids=subscribed_rss_feeds_ids,
-                            function_call_message=llm_message.function_call,
-                            llm_client=llm_client,
-                            sql_client=sql_client,
-                            llm_tracker=tracker,
-                        ),
-                    )
+                function_call_messages.append(llm_message)
+        # Function calls of a turn are independent of each other, so run them concurrently
+        function_responses = await asyncio.gather(
+            *[
+                __call_function_for_llm(
+                    subscribed_rss_feeds_ids=subscribed_rss_feeds_ids,
+                    function_call_message=function_call_message.function_call,
+                    llm_client=llm_client,
+                    llm_tracker=tracker,
+                )
+                for function_call_message in function_call_messages
+            ]
+        )
+        if function_responses:
+            logger.info(
+                f"Research turn {turn}: {len(function_responses)} tool calls returned ~"
+                f"{sum(estimate_token_count(function_response.output) for function_response in function_responses)} tokens."
+            )
+        for function_call_message, function_response in zip(
+            function_call_messages, function_responses
+        ):
+            react_intermediate_messages.append(function_call_message)
+            react_intermediate_messages.append(
+                LlmMessage(
+                    type=LlmMessageType.FUNCTION_RESPONSE,
+                    function_response=function_response,
                 )
+            )
     tracker.end()
     raise ValueError("No final answer generated from the LLM.")
 
 
+def __search_in_own_session(search_function, **kwargs) -> str:
+    """
+    Searches embed the query and query the database synchronously, so they run in a worker thread.
+    A session isn't thread safe, so each search gets its own.
+    """
+    with SqlSessionLocal() as sql_session:
+        return search_function(sql_client=sql_session, **kwargs)
+
+
 async def __call_function_for_llm(
     subscribed_rss_feeds_ids: list[int],
     function_call_message: FunctionCallMessage,
     llm_client: LlmClientProxy,
-    sql_client: Session,
     llm_tracker: LlmTracker,
 ) -> FunctionResponseMessage:
     function_response = FunctionResponseMessage(
@@ -399,20 +388,22 @@ async def __call_function_for_llm(
         if function_call_message.name == "CollectAnswerMaterialForSubQuestions":
             sub_questions = function_call_message.args.get("sub_questions", [])
             period = function_call_message.args.get("period", None)
-            function_response.output = __collect_answer_material_for_sub_questions(
+            function_response.output = await asyncio.to_thread(
+                __search_in_own_session,
+                __collect_answer_material_for_sub_questions,
                 subscribed_rss_feeds_ids=subscribed_rss_feeds_ids,
                 llm_client=llm_client,
-                sql_client=sql_client,
                 sub_questions=sub_questions,
                 period=period,
             )
         elif function_call_message.name == "SearchTerms":
             terms = function_call_message.args.get("terms", [])
             period = function_call_message.args.get("period", None)
-            function_response.output = __search_terms(
+            function_response.output = await asyncio.to_thread(
+                __search_in_own_session,
+                __search_terms,
                 subscribed_rss_feeds_ids=subscribed_rss_feeds_ids,
                 llm_client=llm_client,
-                sql_client=sql_client,
                 terms=terms,
                 period=period,
             )
@@ -279,6 +279,8 @@ async def __chunk_and_summarize_news_per_period(
                         start_date, end_date, subscribed_feed_id_list
                     )
                 )
+                .distinct(__get_news_story_id())
+                .order_by(*__get_news_story_order())
                 .all()
             )
 
@@ -402,6 +404,8 @@ async def __cluster_and_summarize_news(
                     start_date, end_date, subscribed_feed_id_list
                 )
             )
+            .distinct(__get_news_story_id())
+            .order_by(*__get_news_story_order())
             .all()
         )
         if not news_entry_id_and_embeddings:
@@ -670,6 +674,14 @@ async def expand_news_summary(
     await __expand_single_news_summary(summary_entry, llm_tracker)
     llm_tracker.end()
 
+def __get_news_story_id():
+    # Copies of a story from different subscribed feeds share their canonical entry's id
+    return func.coalesce(NewsEntry.duplicate_of_id, NewsEntry.id)
+
+def __get_news_story_order():
+    # DISTINCT ON keeps the first row of each story, which should be the canonical entry if it's subscribed
+    return [__get_news_story_id(), NewsEntry.duplicate_of_id.asc().nulls_first(), NewsEntry.id]
+
 def __get_news_entry_filter_for_summarization(
     start_date: date, end_date: date, subscribed_feed_id_list: list[int]
 ):
@@ -0,0 +1,92 @@
+from datetime import datetime
+from sqlalchemy import Row
+from utils.logger import logger
+from utils.text import estimate_token_count, truncate_to_token_budget
+import os
+
+# Tokens of news entries one search tool response may hold
+RETRIEVAL_CONTEXT_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_CONTEXT_TOKEN_BUDGET", "8000"))
+# Text of each news entry is cut to this so that one long article doesn't take the whole budget
+MAX_ENTRY_TEXT_TOKENS = 150
+# Recency bonus halves every this many days
+RECENCY_HALF_LIFE_DAYS = 30
+# Cosine distance a brand new entry is ahead of an equally near old one
+RECENCY_WEIGHT = 0.05
+
+TEXT_SEARCH_RESPONSE_TEMPLATE = """
+    News entries for {text}:
+    {news_entries}
+"""
+
+
+class RetrievedNewsEntry:
+    def __init__(self, news_entry: Row, query_index: int, distance: float):
+        self.news_entry = news_entry
+        self.query_index = query_index
+        self.distance = distance
+
+    def get_publish_time(self) -> datetime:
+        return self.news_entry.pub_time or self.news_entry.crawl_time
+
+    def get_score(self, now: datetime) -> float:
+        """
+        Lower is better. Cosine distance to the nearest query minus a bonus for recent entries.
+        """
+        age_days = max((now - self.get_publish_time()).total_seconds() / 86400, 0)
+        return self.distance - RECENCY_WEIGHT * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    def to_simple_dict(self) -> dict:
+        news_entry = self.news_entry
+        text = news_entry.content or news_entry.description or ""
+        return {
+            "title": news_entry.title,
+            "text": truncate_to_token_budget(text, MAX_ENTRY_TEXT_TOKENS),
+            "publish_time": self.get_publish_time().date().isoformat(),
+            "url": news_entry.entry_url or "",
+        }
+
+
+def assemble_retrieval_context(
+    query_list: list[str],
+    search_results: list[list[tuple[Row, float]]],
+    token_budget: int = RETRIEVAL_CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """
+    Pack news entries found for the queries into a tool response of at most about token_budget tokens.
+    An entry found by several queries is listed once, under the query it is nearest to. Entries are taken best
+    first by distance and recency with their text truncated, until the budget is used up.
+    """
+    retrieved_by_entry_id: dict[int, RetrievedNewsEntry] = {}
+    for query_index, query_results in enumerate(search_results):
+        for news_entry, distance in query_results:
+            retrieved = retrieved_by_entry_id.get(news_entry.id)
+            if retrieved is None or distance < retrieved.distance:
+                retrieved_by_entry_id[news_entry.id] = RetrievedNewsEntry(news_entry, query_index, distance)
+    now = datetime.now()
+    ranked_entries = sorted(retrieved_by_entry_id.values(), key=lambda retrieved: retrieved.get_score(now))
+
+    # Room left after the per query headers
+    token_count = sum(
+        estimate_token_count(TEXT_SEARCH_RESPONSE_TEMPLATE.format(text=query, news_entries=[]))
+        for query in query_list
+    )
+    simple_entries_per_query = [[] for _ in query_list]
+    packed_count = 0
+    for retrieved in ranked_entries:
+        simple_entry = retrieved.to_simple_dict()
+        entry_token_count = estimate_token_count(str(simple_entry))
+        if token_count + entry_token_count > token_budget:
+            break
+        simple_entries_per_query[retrieved.query_index].append(simple_entry)
+        token_count += entry_token_count
+        packed_count += 1
+
+    found_count = sum(len(query_results) for query_results in search_results)
+    logger.info(
+        f"Retrieval context: {found_count} entries found for {len(query_list)} queries, "
+        f"{len(ranked_entries)} unique, {packed_count} packed in ~{token_count}/{token_budget} tokens."
+    )
+    return "\n".join(
+        TEXT_SEARCH_RESPONSE_TEMPLATE.format(text=query, news_entries=simple_entries)
+        for query, simple_entries in zip(query_list, simple_entries_per_query)
+    )
@@ -29,7 +29,7 @@ from utils.manage_session import limit_usage
 from typing import Annotated
 import xml.etree.ElementTree as ET
 from utils.logger import logger
-from utils.rss import is_valid_rss_feed
+from utils.rss import validate_rss_feeds, RSS_VALIDATION_DEADLINE_SECONDS
 from constants import MAX_RSS_SUBSCRIPTION
 from enum import Enum
 from llm.client_proxy import LlmMessageType
@@ -41,6 +41,7 @@ from utils.conversation_history import convert_to_api_conversation_history
 import enum
 from sqlalchemy import func, or_
 from datetime import datetime
+import time
 
 DOMAIN = os.getenv("DOMAIN", "localhost:3000")
 
@@ -382,6 +383,7 @@ async def upload_rss_feeds(
     request: Request,
     user: GetUserInSession,
     sql_client: db.SqlClient,
+    redis_client: db.RedisClient,
     opml_file: UploadFile | None = None,
     use_default: Annotated[bool, Form()] = False):
     if not user:
@@ -430,10 +432,25 @@ async def upload_rss_feeds(
     for db_feed in existing_feeds:
         if db_feed.feed_url in feeds_to_add:
             del feeds_to_add[db_feed.feed_url]
-    valid_feeds_to_add = []
-    for feed_url, db_feed in feeds_to_add.items():
-        if is_valid_rss_feed(db_feed.feed_url) or is_valid_rss_feed(db_feed.html_url):
-            valid_feeds_to_add.append(db_feed)
+    # Both validation rounds share one deadline. The html url is only tried for feeds whose feed url failed
+    validation_start_time = time.monotonic()
+    feed_url_validation = await validate_rss_feeds(list(feeds_to_add.keys()), redis_client)
+    html_url_validation = await validate_rss_feeds(
+        [
+            db_feed.html_url
+            for feed_url, db_feed in feeds_to_add.items()
+            if not feed_url_validation.get(feed_url)
+        ],
+        redis_client,
+        deadline_seconds=max(
+            RSS_VALIDATION_DEADLINE_SECONDS - (time.monotonic() - validation_start_time), 1
+        ),
+    )
+    valid_feeds_to_add = [
+        db_feed
+        for feed_url, db_feed in feeds_to_add.items()
+        if feed_url_validation.get(feed_url) or html_url_validation.get(db_feed.html_url)
+    ]
 
     if valid_feeds_to_add:
         sql_client.add_all(valid_feeds_to_add)
@@ -482,6 +499,7 @@ async def subscribe_rss_feed(
     request: Request,
     user: GetUserInSession,
     sql_client: db.SqlClient,
+    redis_client: db.RedisClient,
     rss_feed: ApiRssFeed):
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -494,7 +512,7 @@ async def subscribe_rss_feed(
             status_code=400,
             detail=f"Exceeded maximum number of RSS subscriptions: {MAX_RSS_SUBSCRIPTION}",
         )
-    if not is_valid_rss_feed(rss_feed.feed_url):
+    if not (await validate_rss_feeds([rss_feed.feed_url], redis_client)).get(rss_feed.feed_url):
         raise HTTPException(status_code=400, detail="Invalid RSS feed URL")
     existing_feed = sql_client.query(RssFeed).filter(
         RssFeed.feed_url == rss_feed.feed_url
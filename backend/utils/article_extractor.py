@@ -0,0 +1,108 @@
+from lxml import etree
+import lxml.html
+import re
+
+# Elements which never hold article text
+NON_CONTENT_TAGS = [
+    "script", "style", "noscript", "iframe", "svg", "form", "nav", "header", "footer", "aside", "button", "select",
+]
+# class or id hints of page chrome and of article bodies, as used by readability
+_UNLIKELY_PATTERN = re.compile(
+    r"comment|sidebar|footer|header|nav|menu|share|social|promo|related|advert|\bads?\b|cookie|subscribe|newsletter|popup|banner|breadcrumb",
+    re.IGNORECASE,
+)
+_LIKELY_PATTERN = re.compile(r"article|body|content|entry|main|post|story|text", re.IGNORECASE)
+# Blocks whose text is collected from the chosen article node
+TEXT_BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "li", "blockquote", "pre"}
+# Paragraphs shorter than this are ignored when scoring
+MIN_SCORED_PARAGRAPH_LENGTH = 25
+# Extraction fails if less text than this is found, e.g. on pages behind a paywall
+MIN_ARTICLE_TEXT_LENGTH = 200
+MAX_ARTICLE_TEXT_LENGTH = 20000
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# lxml refuses str input starting with an encoding declaration, e.g. XHTML pages
+_XML_DECLARATION_PATTERN = re.compile(r"^\ufeff?\s*<\?xml[^>]*\?>")
+
+
+def _get_text(element: etree.ElementBase) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", element.text_content()).strip()
+
+
+def _get_class_weight(element: etree.ElementBase) -> int:
+    hint = f"{element.get('class', '')} {element.get('id', '')}"
+    weight = 0
+    if _LIKELY_PATTERN.search(hint):
+        weight += 25
+    if _UNLIKELY_PATTERN.search(hint):
+        weight -= 25
+    return weight
+
+
+def _get_link_density(element: etree.ElementBase, text_length: int) -> float:
+    if text_length == 0:
+        return 1
+    link_text_length = sum(len(_get_text(link)) for link in element.iter("a"))
+    return link_text_length / text_length
+
+
+def _remove_page_chrome(doc: etree.ElementBase):
+    etree.strip_elements(doc, *NON_CONTENT_TAGS, etree.Comment, with_tail=False)
+    for element in list(doc.iter()):
+        if not isinstance(element.tag, str) or element.tag in ("html", "body", "article", "main"):
+            continue
+        hint = f"{element.get('class', '')} {element.get('id', '')}"
+        if _UNLIKELY_PATTERN.search(hint) and not _LIKELY_PATTERN.search(hint):
+            element.drop_tree()
+
+
+def extract_article_text(html: str) -> str | None:
+    """
+    Extract the main article text of a web page the way readability does. Paragraphs are scored by length and
+    commas, their scores propagate to their parent and grandparent, and the best scoring container with few links
+    wins. Returns None if no article is found.
+    Pure CPU work, meant to run in a process pool.
+    """
+    try:
+        doc = lxml.html.document_fromstring(_XML_DECLARATION_PATTERN.sub("", html, count=1))
+    except (etree.ParserError, ValueError):
+        return None
+    _remove_page_chrome(doc)
+
+    scores: dict[etree.ElementBase, float] = {}
+    for paragraph in doc.iter("p", "pre", "td"):
+        text = _get_text(paragraph)
+        if len(text) < MIN_SCORED_PARAGRAPH_LENGTH:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        if parent is None:
+            continue
+        grand_parent = parent.getparent()
+        for candidate, share in ((parent, 1), (grand_parent, 0.5)):
+            if candidate is None:
+                continue
+            if candidate not in scores:
+                scores[candidate] = _get_class_weight(candidate)
+            scores[candidate] += score * share
+    if not scores:
+        return None
+
+    best_candidate = max(
+        scores,
+        key=lambda candidate: scores[candidate]
+        * (1 - _get_link_density(candidate, len(_get_text(candidate)))),
+    )
+    blocks = []
+    for element in best_candidate.iter():
+        if element.tag not in TEXT_BLOCK_TAGS:
+            continue
+        # Nested blocks, e.g. a paragraph inside a list item, are collected with their outer block
+        if any(ancestor.tag in TEXT_BLOCK_TAGS for ancestor in element.iterancestors()):
+            continue
+        text = _get_text(element)
+        if text and _get_link_density(element, len(text)) < 0.5:
+            blocks.append(text)
+    article_text = "\n\n".join(blocks)
+    if len(article_text) < MIN_ARTICLE_TEXT_LENGTH:
+        return None
+    return article_text[:MAX_ARTICLE_TEXT_LENGTH]
@@ -0,0 +1,154 @@
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import hashlib
+import re
+
+# Query parameters which only track where a click came from and never change the article
+TRACKING_QUERY_PARAMS = {"fbclid", "gclid", "ocid", "cmpid", "ref", "mc_cid", "mc_eid", "smid"}
+TRACKING_QUERY_PARAM_PREFIX = "utm_"
+# Number of hash functions in a MinHash signature
+MINHASH_PERMUTATION_NUM = 32
+# Signatures are split into bands for locality sensitive hashing. Two stories become candidates if any band
+# matches, which with 8 bands of 4 rows catches ~99% of pairs with jaccard similarity 0.8 and ~19% at 0.4.
+MINHASH_BAND_NUM = 8
+MINHASH_BAND_ROWS = MINHASH_PERMUTATION_NUM // MINHASH_BAND_NUM
+# Candidates are near duplicates if their estimated jaccard similarity of words reaches this threshold
+MIN_NEAR_DUPLICATE_SIMILARITY = 0.6
+# Short texts like bare titles produce too many false positives, both as MinHash signatures and content hashes
+MIN_MINHASH_WORD_COUNT = 8
+# Mersenne prime so that hash values stay within a BIGINT column
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % (_MINHASH_PRIME - 1) + 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MINHASH_PRIME,
+    )
+    for i in range(MINHASH_PERMUTATION_NUM)
+]
+
+_HTML_TAG_PATTERN = re.compile(r"<[^>]*>")
+_NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+
+def canonicalize_url(url: str | None) -> str | None:
+    """
+    Normalize an article url so that copies of it with a different scheme, "www." host, trailing slash,
+    fragment or tracking parameters compare equal.
+    """
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+        host = parts.hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.removeprefix("www.")
+    path = parts.path.rstrip("/")
+    if not path and not parts.query:
+        # Links to a site's front page don't identify an article
+        return None
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_QUERY_PARAMS
+            and not key.lower().startswith(TRACKING_QUERY_PARAM_PREFIX)
+        )
+    )
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def _get_words(text: str) -> list[str]:
+    text = _HTML_TAG_PATTERN.sub(" ", text)
+    return _NON_WORD_PATTERN.sub(" ", text.lower()).split()
+
+
+def get_content_hash(*texts: str | None) -> str | None:
+    """
+    Hash of the normalized texts. Copies differing only in markup, case or punctuation get the same hash.
+    """
+    words = _get_words(" ".join(text for text in texts if text))
+    if len(words) < MIN_MINHASH_WORD_COUNT:
+        return None
+    return hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _hash_word(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def get_minhash(*texts: str | None) -> list[int] | None:
+    """
+    MinHash signature of the texts' words. The fraction of equal values between two signatures estimates the
+    jaccard similarity of their word sets, which stays high for lightly edited copies of a story.
+    """
+    words = set(_get_words(" ".join(text for text in texts if text)))
+    if len(words) < MIN_MINHASH_WORD_COUNT:
+        return None
+    word_hashes = [_hash_word(word) for word in words]
+    return [
+        min((a * word_hash + b) % _MINHASH_PRIME for word_hash in word_hashes)
+        for a, b in _MINHASH_PERMUTATIONS
+    ]
+
+
+def get_minhash_similarity(minhash_a: list[int], minhash_b: list[int]) -> float:
+    return sum(1 for a, b in zip(minhash_a, minhash_b) if a == b) / len(minhash_a)
+
+
+class NearDuplicateIndex:
+    """
+    In-memory index of canonical stories by canonical url, content hash and MinHash bands.
+    Keys are whatever identifies a canonical story to the caller, e.g. a news entry id.
+    """
+
+    def __init__(self):
+        self.__key_by_canonical_url: dict[str, object] = {}
+        self.__key_by_content_hash: dict[str, object] = {}
+        self.__minhash_buckets: dict[(int, tuple[int, ...]), list[(list[int], object)]] = {}
+
+    @staticmethod
+    def __get_bands(minhash: list[int]) -> list[(int, tuple[int, ...])]:
+        return [
+            (band, tuple(minhash[band * MINHASH_BAND_ROWS : (band + 1) * MINHASH_BAND_ROWS]))
+            for band in range(MINHASH_BAND_NUM)
+        ]
+
+    def add(
+        self,
+        key: object,
+        canonical_url: str | None,
+        content_hash: str | None,
+        minhash: list[int] | None,
+    ):
+        if canonical_url is not None:
+            self.__key_by_canonical_url.setdefault(canonical_url, key)
+        if content_hash is not None:
+            self.__key_by_content_hash.setdefault(content_hash, key)
+        if minhash is not None:
+            for band in self.__get_bands(minhash):
+                self.__minhash_buckets.setdefault(band, []).append((minhash, key))
+
+    def find(
+        self,
+        canonical_url: str | None,
+        content_hash: str | None,
+        minhash: list[int] | None,
+    ) -> object | None:
+        """
+        Return the key of the canonical story matching any of the fingerprints, or None.
+        """
+        if canonical_url is not None and canonical_url in self.__key_by_canonical_url:
+            return self.__key_by_canonical_url[canonical_url]
+        if content_hash is not None and content_hash in self.__key_by_content_hash:
+            return self.__key_by_content_hash[content_hash]
+        if minhash is not None:
+            for band in self.__get_bands(minhash):
+                for candidate_minhash, key in self.__minhash_buckets.get(band, []):
+                    if (
+                        get_minhash_similarity(minhash, candidate_minhash)
+                        >= MIN_NEAR_DUPLICATE_SIMILARITY
+                    ):
+                        return key
+        return None
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+import fcntl
+import hashlib
+import json
+import os
+import zstandard
+
+# Bodies are kept for later reparses, so the archive must live somewhere that survives reboots
+FEED_ARCHIVE_DIR = os.getenv(
+    "FEED_ARCHIVE_DIR", os.path.join(os.path.expanduser("~"), "llmapps_data", "feed_archive")
+)
+# Fetches older than this are pruned from the archive
+FEED_ARCHIVE_RETENTION = timedelta(days=int(os.getenv("FEED_ARCHIVE_RETENTION_DAYS", "90")))
+ZSTD_COMPRESSION_LEVEL = 10
+
+
+class ArchivedFetch:
+    def __init__(self, feed_id: int, feed_url: str, fetch_time: datetime, content_hash: str):
+        self.feed_id = feed_id
+        self.feed_url = feed_url
+        self.fetch_time = fetch_time
+        self.content_hash = content_hash
+
+
+def _get_body_path(content_hash: str) -> str:
+    # Fan out by hash prefix so that no directory grows too large
+    return os.path.join(FEED_ARCHIVE_DIR, "bodies", content_hash[:2], f"{content_hash}.zst")
+
+
+def _get_index_path(feed_id: int) -> str:
+    return os.path.join(FEED_ARCHIVE_DIR, "index", f"{feed_id}.jsonl")
+
+
+def archive_feed_body(feed_id: int, feed_url: str, fetch_time: datetime, content: bytes) -> str:
+    """
+    Store a fetched feed body zstd compressed under its content hash and record the fetch in the feed's index.
+    Unchanged bodies fetched again are stored only once. Returns the content hash.
+    """
+    content_hash = hashlib.sha256(content).hexdigest()
+    body_path = _get_body_path(content_hash)
+    if not _refresh_body(body_path):
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        compressed = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL).compress(content)
+        # Write then rename so that concurrent writers and readers never see a partial file
+        temp_path = f"{body_path}.{os.getpid()}.{id(content)}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(temp_path, body_path)
+    index_path = _get_index_path(feed_id)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    index_line = json.dumps(
+        {"feed_url": feed_url, "fetch_time": fetch_time.isoformat(), "content_hash": content_hash}
+    )
+    with open(index_path, "a") as f:
+        # Locked so that a concurrent prune doesn't drop the line
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(index_line + "\n")
+    return content_hash
+
+
+def _refresh_body(body_path: str) -> bool:
+    """
+    Bump the modification time of an archived body to now. A body's modification time is its last fetch, so
+    pruning by it never removes bodies that unpruned index lines refer to. Returns False if there is no such body.
+    """
+    try:
+        os.utime(body_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def read_feed_body(content_hash: str) -> bytes:
+    with open(_get_body_path(content_hash), "rb") as f:
+        return zstandard.ZstdDecompressor().decompress(f.read())
+
+
+def get_archived_feed_ids() -> list[int]:
+    index_dir = os.path.join(FEED_ARCHIVE_DIR, "index")
+    if not os.path.isdir(index_dir):
+        return []
+    return sorted(
+        int(file_name.removesuffix(".jsonl"))
+        for file_name in os.listdir(index_dir)
+        if file_name.endswith(".jsonl")
+    )
+
+
+def list_archived_fetches(
+    feed_id: int, since: datetime | None = None, until: datetime | None = None
+) -> list[ArchivedFetch]:
+    """
+    Archived fetches of a feed from oldest to newest, optionally limited to a fetch time range.
+    """
+    index_path = _get_index_path(feed_id)
+    if not os.path.exists(index_path):
+        return []
+    archived_fetches = []
+    with open(index_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            fetch_time = datetime.fromisoformat(data["fetch_time"])
+            if since is not None and fetch_time < since:
+                continue
+            if until is not None and fetch_time >= until:
+                continue
+            archived_fetches.append(
+                ArchivedFetch(feed_id, data["feed_url"], fetch_time, data["content_hash"])
+            )
+    archived_fetches.sort(key=lambda archived_fetch: archived_fetch.fetch_time)
+    return archived_fetches
+
+
+def _prune_index(index_path: str, cutoff: datetime) -> int:
+    with open(index_path, "r+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        lines = [line for line in f if line.strip()]
+        kept_lines = [
+            line for line in lines if datetime.fromisoformat(json.loads(line)["fetch_time"]) >= cutoff
+        ]
+        if len(kept_lines) < len(lines):
+            f.seek(0)
+            f.writelines(kept_lines)
+            f.truncate()
+    if not kept_lines:
+        os.remove(index_path)
+    return len(lines) - len(kept_lines)
+
+
+def prune_feed_archive(retention: timedelta = FEED_ARCHIVE_RETENTION) -> (int, int):
+    """
+    Drop fetches older than retention from the indexes and delete bodies not fetched within it.
+    Returns the number of pruned fetches and deleted bodies.
+    """
+    cutoff = datetime.now() - retention
+    pruned_fetch_count = 0
+    for feed_id in get_archived_feed_ids():
+        pruned_fetch_count += _prune_index(_get_index_path(feed_id), cutoff)
+    deleted_body_count = 0
+    for dir_path, _, file_names in os.walk(os.path.join(FEED_ARCHIVE_DIR, "bodies")):
+        for file_name in file_names:
+            body_path = os.path.join(dir_path, file_name)
+            try:
+                if os.path.getmtime(body_path) < cutoff.timestamp():
+                    os.remove(body_path)
+                    deleted_body_count += 1
+            except FileNotFoundError:
+                # Renamed by a concurrent writer
+                pass
+    return pruned_fetch_count, deleted_body_count
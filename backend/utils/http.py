@@ -1,3 +1,104 @@
 from fake_useragent import UserAgent
+from urllib.parse import urlsplit
+import asyncio
+import httpx
 
 ua = UserAgent()
+
+# Seconds an idle keep-alive connection stays in the pool
+KEEPALIVE_EXPIRY_SECONDS = 30
+
+
+class AsyncHttpFetcher:
+    """
+    Shared async http client with pooled keep-alive connections.
+    It caps the total number of in-flight requests and the number of concurrent requests per host so that
+    a large crawl doesn't hammer a single site or open an unbounded number of sockets.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_per_host: int,
+        timeout: float,
+        headers: dict[str, str] | None = None,
+    ):
+        self.__client = httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+        self.__in_flight_semaphore = asyncio.Semaphore(max_in_flight)
+        self.__max_per_host = max_per_host
+        self.__host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def __get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ""
+        semaphore = self.__host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.__max_per_host)
+            self.__host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        max_content_bytes: int | None = None,
+    ) -> httpx.Response:
+        """
+        GET the url once both a per-host slot and a global in-flight slot are available.
+        The per-host slot is taken first so that requests queued behind a busy host don't hold global slots.
+        If max_content_bytes is set, the body is streamed and the download is aborted once it exceeds the limit.
+        """
+        async with self.__get_host_semaphore(url):
+            async with self.__in_flight_semaphore:
+                if max_content_bytes is None:
+                    return await self.__client.get(url, headers=headers)
+                return await self.__get_with_size_limit(
+                    url, headers, max_content_bytes
+                )
+
+    async def __get_with_size_limit(
+        self, url: str, headers: dict[str, str] | None, max_content_bytes: int
+    ) -> httpx.Response:
+        async with self.__client.stream("GET", url, headers=headers) as response:
+            content_length = response.headers.get("Content-Length", "")
+            if content_length.isdigit() and int(content_length) > max_content_bytes:
+                raise RuntimeError(
+                    f"Error: content of {url} is too large. Content-Length {content_length}"
+                )
+            content = bytearray()
+            async for chunk in response.aiter_bytes():
+                content.extend(chunk)
+                if len(content) > max_content_bytes:
+                    raise RuntimeError(
+                        f"Error: content of {url} exceeds {max_content_bytes} bytes"
+                    )
+            # The body is already decoded so drop the headers describing the encoded body
+            response_headers = [
+                (key, value)
+                for key, value in response.headers.multi_items()
+                if key.lower() not in ("content-encoding", "content-length")
+            ]
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response_headers,
+                content=bytes(content),
+                request=response.request,
+                extensions=response.extensions,
+            )
+
+    async def aclose(self) -> None:
+        await self.__client.aclose()
+
+    async def __aenter__(self) -> "AsyncHttpFetcher":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -0,0 +1,53 @@
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from dateutil import parser
+
+
+class PubDateFormat(Enum):
+    # RSS 2.0 pubDate, e.g. "Wed, 02 Oct 2002 13:00:00 GMT"
+    RFC_822 = "rfc_822"
+    # Atom published, e.g. "2002-10-02T13:00:00Z"
+    ISO_8601 = "iso_8601"
+    # Anything else dateutil understands
+    OTHER = "other"
+
+
+_PARSE_FUNCTIONS = {
+    PubDateFormat.RFC_822: parsedate_to_datetime,
+    PubDateFormat.ISO_8601: datetime.fromisoformat,
+    PubDateFormat.OTHER: parser.parse,
+}
+# Cheap strict parsers first. dateutil is general but an order of magnitude slower.
+_DEFAULT_FORMAT_ORDER = [PubDateFormat.RFC_822, PubDateFormat.ISO_8601, PubDateFormat.OTHER]
+
+
+class PubDateParser:
+    """
+    Parses publish dates of a single feed. A feed formats all its dates the same way, so the format
+    which parsed the previous date is tried first.
+    """
+
+    def __init__(self):
+        self.preferred_format: PubDateFormat | None = None
+
+    def parse(self, text: str) -> datetime:
+        """
+        Raises ValueError if no format can parse the text.
+        """
+        text = text.strip()
+        format_order = _DEFAULT_FORMAT_ORDER
+        if self.preferred_format is not None:
+            format_order = [self.preferred_format] + [
+                date_format
+                for date_format in _DEFAULT_FORMAT_ORDER
+                if date_format != self.preferred_format
+            ]
+        for date_format in format_order:
+            try:
+                pub_time = _PARSE_FUNCTIONS[date_format](text)
+            except (ValueError, TypeError, OverflowError):
+                continue
+            self.preferred_format = date_format
+            return pub_time
+        raise ValueError(f"Error: unknown date format {text}")
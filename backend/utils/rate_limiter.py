@@ -0,0 +1,72 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket refilled continuously at rate_per_minute, holding at most one minute of tokens.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.__tokens = rate_per_minute
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def __refill(self, now: float):
+        self.__tokens = min(
+            self.capacity, self.__tokens + (now - self.__updated_at) * self.rate_per_second
+        )
+        self.__updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount tokens, going into debt if the bucket doesn't hold enough.
+        Returns seconds to wait until the debt is paid off. Requests larger than the capacity wait for a full bucket.
+        """
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__tokens -= min(amount, self.capacity)
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.rate_per_second
+
+    def drain(self):
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__tokens = min(self.__tokens, 0)
+
+
+class RateLimiter:
+    """
+    Limits calls to an API with a requests per minute and a tokens per minute quota.
+    When the API still answers with a rate limit error, back_off pauses every caller until the retry time.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.__request_bucket = TokenBucket(requests_per_minute)
+        self.__token_bucket = TokenBucket(tokens_per_minute)
+        self.__paused_until = 0.0
+        self.__lock = threading.Lock()
+
+    def acquire(self, token_count: int):
+        """
+        Block until a request of token_count tokens fits in both quotas.
+        """
+        wait_seconds = max(
+            self.__request_bucket.reserve(1), self.__token_bucket.reserve(token_count)
+        )
+        with self.__lock:
+            wait_seconds = max(wait_seconds, self.__paused_until - time.monotonic())
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    def back_off(self, retry_after_seconds: float):
+        """
+        The quota is exhausted on the API side. Pause all callers and drop the tokens believed to be left.
+        """
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, time.monotonic() + retry_after_seconds)
+        self.__request_bucket.drain()
+        self.__token_bucket.drain()
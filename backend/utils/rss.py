@@ -1,9 +1,21 @@
-import requests
+import asyncio
+import redis.asyncio as redis
 import xml.etree.ElementTree as ET
 from constants import ( HTTP_HEADER_USER_AGENT)
+from utils.http import AsyncHttpFetcher
 from utils.logger import logger
         
 ATOM_TAG_PREFIX = "{http://www.w3.org/2005/Atom}"
+# Validation results are cached per URL. Invalid results expire sooner in case the site is fixed
+RSS_VALIDATION_CACHE_KEY_PREFIX = "rss_valid:"
+VALID_RSS_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+INVALID_RSS_CACHE_TTL_SECONDS = 6 * 60 * 60
+# Whole validation of an OPML import has to finish within this, slow feeds count as invalid
+RSS_VALIDATION_DEADLINE_SECONDS = 15
+RSS_VALIDATION_FETCH_TIMEOUT_SECONDS = 10
+MAX_IN_FLIGHT_RSS_VALIDATIONS = 50
+MAX_RSS_VALIDATIONS_PER_HOST = 4
+MAX_RSS_VALIDATION_DOCUMENT_BYTES = 5 * 1024 * 1024
 
 def is_valid_rss_type(content_type: str) -> bool:
     """
@@ -29,31 +41,103 @@ def get_atom_tag(tag: str) -> str:
         return tag
     return f"{ATOM_TAG_PREFIX}{tag}"
 
-def is_valid_rss_feed(feed_url: str) -> bool:
+def is_valid_rss_doc(content: bytes) -> bool:
     """
-    Check if the given URL is a valid RSS feed URL.
+    Check if the document is an RSS 2.0 or Atom feed.
     """
-    headers = {
-            'User-Agent': HTTP_HEADER_USER_AGENT
-        }
     try:
-        response = requests.head(feed_url, timeout=30, headers=headers)
-    except Exception as e:
-        logger.error(f"Error checking feed URL: {feed_url}, Error: {e}")
-        return False
-    response = requests.get(feed_url, timeout=30, headers=headers)
-    content_type = response.headers.get('Content-Type', '')
-    if not is_valid_rss_type(content_type):
+        root_doc = ET.fromstring(content)
+    except ET.ParseError:
         return False
-    if response.status_code >= 400: 
-        logger.error(f"Error checking feed URL: {feed_url}")
-        return False
-    root_doc = ET.fromstring(response.text)
     rss_root = root_doc.find(".//rss")
     if root_doc.tag == "rss":
         return root_doc.get("version") == "2.0"
     elif rss_root is not None:
         return True
+    return root_doc.tag == get_atom_tag("feed")
+
+
+async def __fetch_and_validate_rss_feed(fetcher: AsyncHttpFetcher, feed_url: str) -> bool:
+    response = await fetcher.get(feed_url, max_content_bytes=MAX_RSS_VALIDATION_DOCUMENT_BYTES)
+    if response.status_code >= 400:
+        logger.error(f"Error checking feed URL: {feed_url}, status code {response.status_code}")
+        return False
+    if not is_valid_rss_type(response.headers.get("Content-Type", "")):
+        return False
+    # Large documents take a while to parse so keep the parse off the event loop
+    return await asyncio.to_thread(is_valid_rss_doc, response.content)
+
 
-    if root_doc.tag == get_atom_tag("feed"):
-        return True
\ No newline at end of file
+async def validate_rss_feeds(
+    feed_urls: list[str],
+    redis_client: redis.Redis,
+    deadline_seconds: float = RSS_VALIDATION_DEADLINE_SECONDS,
+) -> dict[str, bool]:
+    """
+    Check which of the URLs are valid RSS feeds. Cached results are read from redis in one round trip,
+    the rest are fetched concurrently. Feeds not validated before the deadline or failing to fetch count as
+    invalid and are not cached, so that a slow site isn't rejected for the whole TTL. If redis is unavailable,
+    every feed is validated without the cache.
+    """
+    feed_urls = list(dict.fromkeys(feed_url for feed_url in feed_urls if feed_url))
+    if not feed_urls:
+        return {}
+    try:
+        cached_results = await redis_client.mget(
+            [f"{RSS_VALIDATION_CACHE_KEY_PREFIX}{feed_url}" for feed_url in feed_urls]
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Failed to read cached RSS feed validations: {e}")
+        cached_results = [None] * len(feed_urls)
+    results = {}
+    uncached_feed_urls = []
+    for feed_url, cached_result in zip(feed_urls, cached_results):
+        if cached_result is None:
+            uncached_feed_urls.append(feed_url)
+        else:
+            results[feed_url] = cached_result == "1"
+    if not uncached_feed_urls:
+        return results
+
+    async with AsyncHttpFetcher(
+        max_in_flight=MAX_IN_FLIGHT_RSS_VALIDATIONS,
+        max_per_host=MAX_RSS_VALIDATIONS_PER_HOST,
+        timeout=RSS_VALIDATION_FETCH_TIMEOUT_SECONDS,
+        headers={"User-Agent": HTTP_HEADER_USER_AGENT},
+    ) as fetcher:
+        tasks = {
+            asyncio.create_task(__fetch_and_validate_rss_feed(fetcher, feed_url)): feed_url
+            for feed_url in uncached_feed_urls
+        }
+        done, pending = await asyncio.wait(tasks, timeout=deadline_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(
+                f"{len(pending)} of {len(tasks)} RSS feeds were not validated within {deadline_seconds} seconds"
+            )
+            await asyncio.wait(pending)
+
+    for task in done:
+        feed_url = tasks[task]
+        if task.exception() is not None:
+            logger.error(f"Error checking feed URL: {feed_url}, Error: {task.exception()}")
+            continue
+        results[feed_url] = task.result()
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for feed_url in uncached_feed_urls:
+                if feed_url not in results:
+                    continue
+                is_valid = results[feed_url]
+                pipe.set(
+                    f"{RSS_VALIDATION_CACHE_KEY_PREFIX}{feed_url}",
+                    "1" if is_valid else "0",
+                    ex=VALID_RSS_CACHE_TTL_SECONDS if is_valid else INVALID_RSS_CACHE_TTL_SECONDS,
+                )
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Failed to cache RSS feed validations: {e}")
+    for feed_url in uncached_feed_urls:
+        results.setdefault(feed_url, False)
+    return results
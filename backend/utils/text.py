@@ -0,0 +1,102 @@
+from lxml import etree
+import html
+import lxml.html
+import re
+
+# Elements whose text is never shown to a reader
+INVISIBLE_TAGS = ["script", "style", "noscript", "iframe", "svg", "head"]
+# Elements which start a new line when rendered
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "tr", "table",
+    "section", "article", "figure", "figcaption", "hr",
+}
+MAX_NORMALIZED_TEXT_LENGTH = 20000
+# Rough number of characters per LLM token of english text
+CHARS_PER_TOKEN = 4
+_READ_MORE = r"(Continue reading|Read more|Read the full (story|article)|Read full article)\b"
+# Trailers which feed generators append to every item. A read more trailer must stand on its own line so that
+# a final sentence merely containing the words is kept.
+_BOILERPLATE_PATTERNS = [
+    re.compile(r"\s*The post .{0,300}? appeared first on .{0,200}?$", re.IGNORECASE | re.DOTALL),
+    re.compile(r"(^|\n)\s*" + _READ_MORE + r"[^\n]{0,100}$", re.IGNORECASE),
+    re.compile(r"\s*\[(…|\.\.\.)\]\s*$"),
+]
+# Text of a read more link ending an item, even when it shares the last paragraph with the item's text
+_READ_MORE_LINK_PATTERN = re.compile(r"\W{0,5}" + _READ_MORE + r".{0,100}", re.IGNORECASE | re.DOTALL)
+# Only an actual start or end tag or a comment makes the text markup. "a <b" is plain text.
+_TAG_PATTERN = re.compile(r"<[a-zA-Z][\w:-]*(\s[^<>]*)?/?>|</[a-zA-Z][\w:-]*\s*>|<!--")
+_ENTITY_PATTERN = re.compile(r"&[#a-zA-Z0-9]+;")
+_INLINE_WHITESPACE_PATTERN = re.compile(r"[^\S\n]+")
+_LINE_BREAK_PATTERN = re.compile(r"\s*\n\s*")
+
+
+def _drop_trailing_read_more_link(fragment: etree.ElementBase):
+    links = list(fragment.iter("a"))
+    if not links:
+        return
+    last_link = links[-1]
+    link_text = last_link.text_content().strip()
+    if (
+        _READ_MORE_LINK_PATTERN.fullmatch(link_text)
+        and fragment.text_content().rstrip().endswith(link_text)
+    ):
+        last_link.drop_tree()
+
+
+def _markup_to_text(text: str) -> str:
+    try:
+        fragment = lxml.html.fragment_fromstring(text, create_parent="div")
+    except (etree.ParserError, ValueError):
+        return html.unescape(text)
+    etree.strip_elements(fragment, *INVISIBLE_TAGS, etree.Comment, with_tail=False)
+    _drop_trailing_read_more_link(fragment)
+    for element in fragment.iter():
+        if element.tag in BLOCK_TAGS:
+            element.tail = "\n" + (element.tail or "")
+    # lxml decodes entities while parsing
+    return fragment.text_content()
+
+
+def html_to_text(text: str | None) -> str | None:
+    """
+    Normalize an HTML snippet of a feed item into plain text. Markup and invisible elements are dropped,
+    entities decoded, whitespace collapsed with block elements kept on their own lines,
+    and feed generator boilerplate trimmed from the end.
+    """
+    if text is None:
+        return None
+    if _TAG_PATTERN.search(text):
+        text = _markup_to_text(text)
+    elif _ENTITY_PATTERN.search(text):
+        text = html.unescape(text)
+    text = _INLINE_WHITESPACE_PATTERN.sub(" ", text)
+    text = _LINE_BREAK_PATTERN.sub("\n", text).strip()
+    for pattern in _BOILERPLATE_PATTERNS:
+        text = pattern.sub("", text)
+    text = text[:MAX_NORMALIZED_TEXT_LENGTH]
+    return text or None
+
+
+def estimate_token_count(text: str | None) -> int:
+    """
+    Cheap local estimate of LLM tokens in the text. Exact counts need a call to the model API.
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_token_budget(text: str, token_budget: int) -> str:
+    """
+    Cut the text to about token_budget tokens, preferring to end at a line or sentence instead of mid word.
+    """
+    max_length = token_budget * CHARS_PER_TOKEN
+    if len(text) <= max_length:
+        return text
+    text = text[:max_length]
+    # Only back off to a boundary if that keeps most of the budget
+    for boundary in ("\n", ". ", " "):
+        boundary_index = text.rfind(boundary)
+        if boundary_index > max_length // 2:
+            return text[: boundary_index + 1].rstrip()
+    return text